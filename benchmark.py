@@ -0,0 +1,83 @@
+"""
+Client benchmarks against a local MockLocuServer.
+
+    python benchmark.py --venues 2000 --latency 0.005 --error-rate 0
+
+Reports throughput, p50/p99 latency and failed calls of search
+pagination, bulk get_details, is_open and get_menus. Runs are
+reproducible for a given seed, so results can be compared between
+changes. With --error-rate, --retries sets how often failed requests
+are sent again.
+"""
+import argparse
+import random
+import time
+
+from locu import VenueApiClient, RetryPolicy
+from locu.api import HttpException
+from locu.testing import MockLocuServer, make_venues
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))
+    return samples[index]
+
+
+def measure(name, calls, fn):
+    """Run fn for each argument in calls and print a result line."""
+    timings = []
+    failed = 0
+    start = time.time()
+    for args in calls:
+        t = time.time()
+        try:
+            result = fn(*args)
+            # get_details_bulk reports failed chunks instead of raising
+            if isinstance(result, dict) and result.get('errors'):
+                failed += 1
+        except HttpException:
+            failed += 1
+        timings.append(time.time() - t)
+    elapsed = time.time() - start
+    print '%-22s %8d %10.1f %10.2f %10.2f %8d' % (name, len(timings), len(timings) / elapsed,
+                                                   percentile(timings, 0.5) * 1000,
+                                                   percentile(timings, 0.99) * 1000, failed)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.strip().split('\n')[0])
+    parser.add_argument('--venues', type = int, default = 1000, help = 'number of synthetic venues')
+    parser.add_argument('--latency', type = float, default = 0.0, help = 'server latency in seconds')
+    parser.add_argument('--error-rate', type = float, default = 0.0, help = 'fraction of failed requests')
+    parser.add_argument('--calls', type = int, default = 200, help = 'calls per benchmark')
+    parser.add_argument('--retries', type = int, default = 0, help = 'retries of failed requests')
+    parser.add_argument('--workers', type = int, default = 8, help = 'max_workers of get_details_bulk')
+    parser.add_argument('--seed', type = int, default = 0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    venues = make_venues(args.venues, seed = args.seed)
+    with MockLocuServer(venues, latency = args.latency, error_rate = args.error_rate, seed = args.seed) as server:
+        retry = RetryPolicy(max_retries = args.retries, backoff = 0.01) if args.retries else None
+        client = VenueApiClient('benchmark', api_url = server.api_url, retry = retry)
+        ids = [venue['id'] for venue in venues]
+        sample = [rng.choice(ids) for _ in xrange(args.calls)]
+
+        print '%-22s %8s %10s %10s %10s %8s' % ('benchmark', 'calls', 'calls/s', 'p50 ms', 'p99 ms', 'failed')
+        measure('search pagination', [('San Francisco',)] * max(1, args.calls // 20),
+                lambda locality: list(client.iter_search(locality = locality)))
+        bulk = [ids[i:i + 100] for i in xrange(0, min(len(ids), args.calls * 5), 100)]
+        measure('get_details_bulk(100)', [(chunk,) for chunk in bulk],
+                lambda chunk: client.get_details_bulk(chunk, max_workers = args.workers))
+        measure('is_open', [(id,) for id in sample],
+                lambda id: client.is_open(id, '12:00:00', 'Monday'))
+        measure('get_menus', [(id,) for id in sample], client.get_menus)
+        print 'server requests: %d, errors: %d' % (server.requests, server.errors)
+
+
+if __name__ == '__main__':
+    main()
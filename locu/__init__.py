@@ -1,3 +1,10 @@
 #!/usr/bin/env python                                         
 # Copyright 2012 Locu <maksims@locu.com> <kkamalov@locu.com>  
 from api import *
+from async_api import *
+from spatial import *
+from lookup import *
+from crawler import *
+from analytics import *
+from sync import *
+from pipeline import *
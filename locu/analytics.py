@@ -0,0 +1,211 @@
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = [
+    'MenuTable',
+]
+
+_price_re = re.compile(r'\d+(?:\.\d+)?')
+
+def parse_price(price):
+    """'$9.50' -> 9.5, missing or unreadable prices -> nan"""
+    if isinstance(price, (int, float)):
+        return float(price)
+    match = _price_re.search(price or '')
+    if match is None:
+        return float('nan')
+    return float(match.group())
+
+def _codes(values):
+    """Encode values as integer codes into a list of distinct values."""
+    index = {}
+    labels = []
+    codes = []
+    for value in values:
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(labels)
+            labels.append(value)
+        codes.append(code)
+    return np.array(codes, dtype=np.int32), labels
+
+################################################################################
+
+class MenuTable(object):
+    """
+    Menu items of many venues as columns of NumPy arrays.
+
+    One row per menu item. Text columns are stored as integer codes
+    into label lists, so filters and group-bys run as array operations:
+      venue    : venue id
+      locality : locality of the venue
+      menu     : menu name
+      section  : section name
+      name     : item name
+      price    : item price as a float, nan when missing
+
+    Requires numpy.
+    """
+
+    COLUMNS = ('venue', 'locality', 'menu', 'section', 'name')
+
+    def __init__(self, columns, labels, price, cuisines):
+        if np is None:
+            raise ImportError('MenuTable requires numpy')
+        # column -> array of codes into labels[column]
+        self.columns = columns
+        self.labels = labels
+        self.price = price
+        # venue id -> list of cuisines
+        self.cuisines = cuisines
+
+    def __len__(self):
+        return len(self.price)
+
+    @classmethod
+    def from_venues(cls, venues):
+        """
+        Build a table from venue dictionaries with menus,
+        as returned by get_details.
+        """
+        if np is None:
+            raise ImportError('MenuTable requires numpy')
+        rows = dict((column, []) for column in cls.COLUMNS)
+        prices = []
+        cuisines = {}
+        for venue in venues:
+            cuisines[venue['id']] = list(venue.get('cuisines') or [])
+            for menu in venue.get('menus') or []:
+                for section in menu.get('sections') or []:
+                    for subsection in section.get('subsections') or []:
+                        for item in subsection.get('contents') or []:
+                            if item.get('type', 'ITEM') != 'ITEM':
+                                continue
+                            rows['venue'].append(venue['id'])
+                            rows['locality'].append(venue.get('locality'))
+                            rows['menu'].append(menu.get('menu_name'))
+                            rows['section'].append(section.get('section_name'))
+                            rows['name'].append(item.get('name'))
+                            prices.append(parse_price(item.get('price')))
+        columns = {}
+        labels = {}
+        for column in cls.COLUMNS:
+            columns[column], labels[column] = _codes(rows[column])
+        return cls(columns, labels, np.array(prices, dtype=np.float64), cuisines)
+
+    def column(self, name):
+        """Values of a column as an array."""
+        if name == 'price':
+            return self.price
+        return np.array(self.labels[name], dtype=object)[self.columns[name]]
+
+    def _take(self, mask):
+        columns = dict((column, codes[mask]) for column, codes in self.columns.iteritems())
+        return MenuTable(columns, self.labels, self.price[mask], self.cuisines)
+
+    def filter(self, price = None, price__gt = None, price__gte = None, price__lt = None, \
+                   price__lte = None, venue = None, locality = None, section = None, name = None):
+        """
+        Rows matching all the given conditions, as a new table.
+        Price conditions work like the search parameters of the same
+        name; venue, locality and section take a list of values and
+        name matches a case-insensitive substring.
+        """
+        mask = np.ones(len(self.price), dtype=bool)
+        # comparisons with nan are False, so items without a price drop out
+        with np.errstate(invalid='ignore'):
+            if price is not None:
+                mask &= self.price == price
+            if price__gt is not None:
+                mask &= self.price > price__gt
+            if price__gte is not None:
+                mask &= self.price >= price__gte
+            if price__lt is not None:
+                mask &= self.price < price__lt
+            if price__lte is not None:
+                mask &= self.price <= price__lte
+        for column, values in (('venue', venue), ('locality', locality), ('section', section)):
+            if values is not None:
+                wanted = [i for i, label in enumerate(self.labels[column]) if label in values]
+                mask &= np.in1d(self.columns[column], wanted)
+        if name is not None:
+            name = name.lower()
+            wanted = [i for i, label in enumerate(self.labels['name']) if name in (label or '').lower()]
+            mask &= np.in1d(self.columns['name'], wanted)
+        return self._take(mask)
+
+    def histogram(self, bins = 10, range = None):
+        """
+        Histogram of the known prices.
+
+        Returns:
+          (counts, bin_edges) as returned by numpy.histogram
+        """
+        prices = self.price[~np.isnan(self.price)]
+        return np.histogram(prices, bins=bins, range=range)
+
+    def _stats(self, codes, prices, size):
+        count = np.bincount(codes, minlength=size)
+        total = np.bincount(codes, weights=prices, minlength=size)
+        minimum = np.full(size, np.inf)
+        maximum = np.full(size, -np.inf)
+        np.minimum.at(minimum, codes, prices)
+        np.maximum.at(maximum, codes, prices)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+        return count, mean, minimum, maximum
+
+    def aggregate(self, by = 'locality'):
+        """
+        Price statistics per locality, venue, menu, section or cuisine.
+
+        Items without a price are left out. For 'cuisine' an item counts
+        towards every cuisine of its venue.
+
+        Returns:
+          A dictionary of value -> {'count', 'mean', 'min', 'max'}
+        """
+        known = ~np.isnan(self.price)
+        prices = self.price[known]
+        if by == 'cuisine':
+            venue_codes = self.columns['venue'][known]
+            labels = []
+            index = {}
+            # cuisine codes of every venue
+            venue_cuisines = []
+            for venue in self.labels['venue']:
+                codes = []
+                for cuisine in self.cuisines.get(venue, []):
+                    if cuisine not in index:
+                        index[cuisine] = len(labels)
+                        labels.append(cuisine)
+                    codes.append(index[cuisine])
+                venue_cuisines.append(codes)
+            lengths = np.array([len(c) for c in venue_cuisines], dtype=np.int64)
+            flat = np.array([c for codes in venue_cuisines for c in codes], dtype=np.int64)
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(lengths) else lengths
+            # repeat each row once per cuisine of its venue
+            repeats = lengths[venue_codes]
+            rows = np.repeat(np.arange(len(prices)), repeats)
+            position = np.arange(len(rows)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+            codes = flat[offsets[venue_codes[rows]] + position] if len(rows) else rows
+            prices = prices[rows]
+        else:
+            codes = self.columns[by][known]
+            labels = self.labels[by]
+
+        count, mean, minimum, maximum = self._stats(codes, prices, len(labels))
+        result = {}
+        for i, label in enumerate(labels):
+            if count[i]:
+                result[label] = {
+                    'count': int(count[i]),
+                    'mean': float(mean[i]),
+                    'min': float(minimum[i]),
+                    'max': float(maximum[i]),
+                }
+        return result
@@ -1,15 +1,47 @@
+import httplib
+import sys
+import threading
+import time
+import zlib
+from Queue import Empty, Queue
 from urllib import urlencode
+from urlparse import parse_qsl, urlsplit
 
 try:
     import simplejson as json
 except :
     import json
 
-from httplib2 import Http
+from cache import ResponseCache, SqliteCache, ValidatorStore
+from coalesce import SingleFlight
+from hours import OpenHoursIndex
+from metrics import Metrics
+from httplib2 import Response
+from pool import ConnectionPool
+from query import PreparedQuery
+from records import MenuItem, Venue, to_records
+from store import EntityStore
+from stream import ObjectStream
+from throttle import RateLimiter, RetryPolicy, shared_rate_limiter
+from workers import Executor
 
 __all__ = [
     'VenueApiClient',
     'MenuItemApiClient',
+    'ResponseCache',
+    'SqliteCache',
+    'ValidatorStore',
+    'PreparedQuery',
+    'ConnectionPool',
+    'RateLimiter',
+    'RetryPolicy',
+    'OpenHoursIndex',
+    'SingleFlight',
+    'ObjectStream',
+    'EntityStore',
+    'Venue',
+    'MenuItem',
+    'Metrics',
 ]
 
 ################################################################################
@@ -26,7 +58,6 @@ class HttpException(Exception):
 
 ################################################################################
 
-
 class HttpApiClient(object):
     """
     Base implementation for an HTTP
@@ -35,14 +66,92 @@ class HttpApiClient(object):
     Http connection.
     """
 
-    def __init__(self, api_key, base_url):
-        """Initialize base http client."""
-        self.conn = Http()
+    # record type returned for search and details objects in records mode
+    record_class = None
+    # kind of the search and details objects in an entity store
+    entity_kind = None
+
+    def __init__(self, api_key, base_url, cache = None, pool = None, rate_limit = None, retry = None, \
+                     coalesce = False, records = False, observers = None, revalidate = False, \
+                     entity_store = None):
+        """
+        Initialize base http client.
+
+        Args:
+          api_key  : MenuPlatform API key
+          base_url : url the service paths are appended to
+          cache    : optional response cache. Ex ResponseCache(ttls = {'details': 3600})
+          pool     : ConnectionPool to take connections from, may be shared
+                     between clients. Defaults to a pool of 10 connections
+          rate_limit : requests per second shared by all clients of api_key,
+                       or a RateLimiter of this client's own. Clients of one
+                       key must agree on the rate, ValueError otherwise
+          retry    : RetryPolicy for retryable statuses and transport errors
+          coalesce : share one request between concurrent identical calls.
+                     True, or a SingleFlight to share between clients
+          records  : return search and details objects as compact Venue or
+                     MenuItem records instead of dictionaries
+          observers : callables given one event dictionary per request,
+                      see add_observer. Ex [Metrics()]
+          revalidate : send conditional requests for urls fetched before and
+                       answer 304s from the stored copy. True, or a ValidatorStore
+          entity_store : EntityStore merging every object received by id, may
+                         be shared between clients. True for one of this client's own
+        """
+        # httplib2.Http is not thread-safe, each request checks one out
+        self.pool = pool or ConnectionPool()
         # MenuPlatform API key
         self.api_key = api_key
         #base url 
         self.base_url = base_url
-        
+        self.cache = cache
+        if rate_limit is not None and not isinstance(rate_limit, RateLimiter):
+            rate_limit = shared_rate_limiter(api_key, rate_limit)
+        self.rate_limiter = rate_limit
+        self.retry = retry
+        if coalesce is True:
+            coalesce = SingleFlight()
+        self.coalescer = coalesce or None
+        self.records = records
+        self.observers = list(observers or [])
+        if revalidate is True:
+            revalidate = ValidatorStore()
+        elif revalidate is False:
+            revalidate = None
+        self.validators = revalidate
+        if entity_store is True:
+            entity_store = EntityStore()
+        elif entity_store is False:
+            entity_store = None
+        self.entity_store = entity_store
+
+    def add_observer(self, observer):
+        """
+        Call observer(event) after every request made by this client,
+        also for requests that failed or were served from the cache.
+        The event is a dictionary with
+          endpoint       : 'search', 'insight', 'details' or 'next'
+          key            : the request uri without the api_key
+          time           : when the request started
+          status         : HTTP status, None if no response was received
+          bytes          : size of the response body
+          cache          : 'hit', 'miss', 'revalidated' (answered by a 304),
+                           or None without a cache
+          retries        : number of times the request was sent again
+          new_connection : whether a new connection had to be opened
+          wait           : seconds spent waiting for the rate limiter and pool
+          transfer       : seconds spent connecting, sending and receiving
+          decode         : seconds spent decoding the JSON body
+          convert        : seconds spent merging into the entity store and
+                           building records
+          total          : seconds for the whole call
+          error          : the exception raised, or None
+        """
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        self.observers.remove(observer)
+
     def _http_request(self, service_type, **kwargs):
         """
         Perform an HTTP Request using base_url and parameters
@@ -50,21 +159,202 @@ class HttpApiClient(object):
         Results are expected to be given in JSON format
         and are parsed to python data structures.
         """
+        uri = self._build_uri(service_type, **kwargs)
+        return self._request(uri, self._endpoint(service_type))
+
+    def _build_uri(self, service_type, **kwargs):
         request_params = urlencode(kwargs)
         request_params = request_params.replace('%28', '').replace('%29', '')
 
-        uri = '%s%s?api_key=%s&%s' % \
+        return '%s%s?api_key=%s&%s' % \
             (self.base_url, service_type, self.api_key, request_params)
-        header, response = self.conn.request(uri, method='GET')
-        return header, response
 
     def _http_uri_request(self, uri):
-        header, response = self.conn.request(uri, method='GET')
+        return self._request(uri, 'next')
+
+    def _endpoint(self, service_type):
+        """Name of the kind of call made for service_type."""
+        if service_type in ('search/', 'insight/'):
+            return service_type[:-1]
+        return 'details'
+
+    def _cache_key(self, uri):
+        """
+        Canonical form of uri: query parameters sorted
+        and the api_key left out.
+        """
+        scheme, netloc, path, query, _ = urlsplit(uri)
+        params = sorted((k, v) for k, v in parse_qsl(query, keep_blank_values=True)
+                        if k != 'api_key')
+        return '%s://%s%s?%s' % (scheme, netloc, path, urlencode(params))
+
+    def _request(self, uri, endpoint, event = None, key = None):
+        if key is None and (self.cache is not None or self.validators is not None):
+            key = self._cache_key(uri)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if event is not None:
+                event['cache'] = 'miss' if cached is None else 'hit'
+            if cached is not None:
+                return cached
+
+        # httplib2 decompresses gzip and deflate bodies
+        headers = {'accept-encoding': 'gzip, deflate'}
+        if self.validators is not None:
+            headers.update(self.validators.headers(key))
+        header, response = self._send(uri, event, headers)
+        if self.validators is not None:
+            if header.status == 304:
+                stored = self.validators.get(key)
+                if stored is not None:
+                    header, response = stored
+                    if event is not None:
+                        event['cache'] = 'revalidated'
+                else:
+                    # dropped from the store in the meantime
+                    header, response = self._send(uri, event, {'accept-encoding': 'gzip, deflate'})
+            elif self._is_http_response_ok(header):
+                self.validators.set(key, header, response)
+        if self.cache is not None and self._is_http_response_ok(header):
+            self.cache.set(key, (header, response), endpoint)
         return header, response
 
+    def _send(self, uri, event = None, headers = None):
+        """
+        Send a GET request, pacing it with the rate limiter
+        and retrying it according to the retry policy.
+        Timings are added to event when given.
+        """
+        retry = self.retry
+        limiter = self.rate_limiter
+        attempt = 0
+        while True:
+            if event is not None:
+                event['retries'] = attempt
+                started = time.time()
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                with self.pool.connection() as conn:
+                    if event is not None:
+                        sending = time.time()
+                        event['wait'] += sending - started
+                        event['new_connection'] = not conn.connections
+                    try:
+                        header, response = conn.request(uri, method='GET', headers=headers)
+                    finally:
+                        if event is not None:
+                            event['transfer'] += time.time() - sending
+            except Exception as error:
+                if limiter is not None:
+                    limiter.failure()
+                if retry is None or attempt >= retry.max_retries or \
+                        not isinstance(error, retry.transport_errors):
+                    raise
+                time.sleep(retry.delay(attempt))
+                attempt += 1
+                continue
+
+            status = int(header['status'])
+            if status == 429 or status >= 500:
+                # the service is overloaded, slow every client of this key down
+                if limiter is not None:
+                    limiter.failure()
+                if retry is not None and retry.is_retryable_status(status) and \
+                        attempt < retry.max_retries:
+                    time.sleep(retry.delay(attempt, header.get('retry-after')))
+                    attempt += 1
+                    continue
+            elif limiter is not None:
+                limiter.success()
+            return header, response
+
     def _is_http_response_ok(self, response):
         return response['status'] == '200' or response['status'] == 200
 
+    def _query(self, uri, endpoint, key = None):
+        """
+        Request uri and parse the JSON response. With coalescing on,
+        concurrent identical queries share one request and its result.
+        key is the canonical form of uri when it is already known.
+        """
+        if self.coalescer is None:
+            return self._query_uncoalesced(uri, endpoint, key)
+        if key is None:
+            key = self._cache_key(uri)
+        return self.coalescer.do(key, self._query_uncoalesced, uri, endpoint, key)
+
+    def _query_uncoalesced(self, uri, endpoint, key = None):
+        if not self.observers:
+            return self._convert(self._parse_response(*self._request(uri, endpoint, key = key)), endpoint)
+
+        event = {
+            'endpoint': endpoint, 'key': key or self._cache_key(uri), 'time': time.time(),
+            'status': None, 'bytes': 0, 'cache': None, 'retries': 0, 'new_connection': False,
+            'wait': 0.0, 'transfer': 0.0, 'decode': 0.0, 'convert': 0.0, 'total': 0.0, 'error': None,
+        }
+        try:
+            header, content = self._request(uri, endpoint, event, key)
+            event['status'] = int(header['status'])
+            event['bytes'] = len(content)
+            decoding = time.time()
+            resp = self._parse_response(header, content)
+            converting = time.time()
+            event['decode'] = converting - decoding
+            resp = self._convert(resp, endpoint)
+            event['convert'] = time.time() - converting
+            return resp
+        except Exception as error:
+            event['error'] = error
+            raise
+        finally:
+            event['total'] = time.time() - event['time']
+            for observer in self.observers:
+                observer(event)
+
+    def _convert(self, resp, endpoint):
+        """Merge the objects of resp into the entity store and make records of them."""
+        if endpoint == 'insight':
+            return resp
+        if self.entity_store is not None:
+            resp = self.entity_store.merge_response(resp, self.entity_kind)
+        if self.records:
+            resp = to_records(resp, self.record_class)
+        return resp
+
+    def _stored(self, id, fields):
+        """
+        Details objects of venue id from the entity store, None unless
+        it has fresh values for fields. They are records in records mode.
+        """
+        if self.entity_store is not None:
+            entity = self.entity_store.get(id, fields)
+            if entity is not None:
+                return [self.record_class(entity) if self.records else entity]
+        return None
+
+    def _stored_details(self, id, fields):
+        """
+        Details objects of venue id: the stored entity when it has fresh
+        values for fields, else the objects returned by get_details.
+        """
+        objects = self._stored(id, fields)
+        if objects is None:
+            objects = self.get_details(id)['objects']
+        return objects
+
+    def _parse_response(self, header, content):
+        """
+        Parse a JSON response, raising HttpException for error statuses.
+        """
+        if not self._is_http_response_ok(header):
+            try:
+                error = json.loads(content).get('error_message', 'Unknown Error')
+            except (ValueError, AttributeError):
+                error = 'Unknown Error'
+            raise HttpException(header.status, header.reason, error)
+        return json.loads(content)
+
     def _get_params(self, name = None, category = None, cuisine = None, description = None, price = None, \
                           price__gt = None, price__gte = None, price__lt = None, price__lte = None, \
                           location = (None, None), radius = None, tl_coord = (None, None), \
@@ -125,23 +415,347 @@ class HttpApiClient(object):
         return params
 
 
+    def prepare(self, endpoint, **kwargs):
+        """
+        Build a query once to execute it many times.
+
+        Args:
+          endpoint : 'search' or 'insight', taking the arguments of the
+                     method of the same name, or 'details' taking ids
+          kwargs   : arguments of the call. Ex locality = 'San Francisco'
+
+        Returns:
+          A PreparedQuery
+
+        Raises:
+          TypeError for unknown endpoints, unexpected arguments or
+          arguments of the wrong type, ValueError for more than 5 ids
+        """
+        kwargs = dict((name, value) for name, value in kwargs.iteritems() if value is not None)
+        if endpoint == 'details':
+            if set(kwargs) != set(['ids']):
+                raise TypeError('details queries take ids only')
+            ids = kwargs['ids']
+            if isinstance(ids, (list, tuple)):
+                if len(ids) > 5:
+                    raise ValueError('details queries take up to 5 ids, use get_details_bulk for more')
+                kwargs['ids'] = ids = tuple(ids)
+                ids = list(ids)
+            uri = self._build_uri(self._id_param(ids))
+        elif endpoint in ('search', 'insight'):
+            # the same helper as the method, so arguments are checked
+            # and turned into params exactly as for a direct call
+            params = getattr(self, '_%s_params' % endpoint)(**kwargs)
+            uri = self._build_uri(endpoint + '/', **params)
+        else:
+            raise TypeError('Unknown endpoint %r' % endpoint)
+        return PreparedQuery(self, endpoint, kwargs, uri, self._cache_key(uri))
+
+    def execute(self, query):
+        """
+        Run a query made by prepare.
+
+        Returns:
+          A dictionary with a data returned by the server
+
+        Raises:
+          HttpException with the error message from the server
+        """
+        return self._query(query.uri, query.endpoint, query.key)
+
+    def _id_param(self, ids):
+        """Details path for one id or a list of up to 5 ids."""
+        if isinstance(ids, list):
+            if len(ids) > 5:
+                ids = ids[:5]
+            return ';'.join(ids) + '/'
+        return str(ids) + '/'
+
     def _create_query(self, category_type, params):
-        header, content = self._http_request(category_type + '/', **params)
-        resp = json.loads(content)
-        if not self._is_http_response_ok(header):
-            error = resp.get('error_message', 'Unknown Error')
-            raise HttpException(header.status, header.reason, error) 
-        return resp
+        uri = self._build_uri(category_type + '/', **params)
+        return self._query(uri, category_type)
+
+    def get_details_bulk(self, ids, max_workers = 4):
+        """
+        Fetch details for any number of ids.
+
+        The ids are split into chunks of 5 (the most a single details
+        call accepts) and the chunks are fetched concurrently.
 
+        Args:
+          ids         : ids of the objects to fetch
+            type : [string]
+          max_workers : number of chunks fetched at the same time
+            type : int
+
+        Returns:
+          A dictionary with
+            'objects' : fetched objects, in the order of the given ids
+            'errors'  : list of {'ids': chunk, 'error': exception} for
+                        every chunk that could not be fetched
+        """
+        unique_ids = []
+        seen = set()
+        for id in ids:
+            id = str(id)
+            if id not in seen:
+                seen.add(id)
+                unique_ids.append(id)
+
+        chunks = [unique_ids[i:i + 5] for i in xrange(0, len(unique_ids), 5)]
+        objects = []
+        errors = []
+        if chunks:
+            executor = Executor(min(max_workers, len(chunks)))
+            try:
+                futures = executor.map(self.get_details, chunks)
+                for chunk, future in zip(chunks, futures):
+                    error = future.exception()
+                    if error is not None:
+                        errors.append({'ids': chunk, 'error': error})
+                    else:
+                        objects += future.result().get('objects', [])
+            finally:
+                executor.shutdown()
+
+        order = dict((id, i) for i, id in enumerate(unique_ids))
+        objects.sort(key=lambda obj: order.get(obj.get('id'), len(order)))
+        return {'objects': objects, 'errors': errors}
+
+    def insight_many(self, specs, max_workers = 4):
+        """
+        Run several insight calls concurrently.
+
+        Args:
+          specs       : insight arguments, one dictionary per call.
+                        Ex [{'dimension': 'cuisine', 'locality': 'San Francisco'}, ...]
+            type : [dict]
+          max_workers : number of calls made at the same time
+            type : int
+
+        Returns:
+          A dictionary with
+            'objects' : list of {'spec': spec, 'objects': counts by value},
+                        in the order of the given specs
+            'errors'  : list of {'spec': spec, 'error': exception} for
+                        every call that failed
+        """
+        return self._insight_many(specs, [None] * len(specs), max_workers)
+
+    def _insight_many(self, specs, results, max_workers):
+        """insight_many, sending only the specs whose result is None."""
+        remote = [i for i, resp in enumerate(results) if resp is None]
+        errors = []
+        if remote:
+            executor = Executor(min(max_workers, len(remote)))
+            try:
+                futures = executor.map(lambda i: self.insight(**specs[i]), remote)
+                for i, future in zip(remote, futures):
+                    error = future.exception()
+                    if error is not None:
+                        errors.append({'spec': specs[i], 'error': error})
+                    else:
+                        results[i] = future.result()
+            finally:
+                executor.shutdown()
+
+        objects = [{'spec': spec, 'objects': resp.get('objects', {})}
+                   for spec, resp in zip(specs, results) if resp is not None]
+        return {'objects': objects, 'errors': errors}
+
+    def iter_search(self, prefetch = 1, max_pages = None, **kwargs):
+        """
+        Iterate over the objects of every result page of a search.
+
+        Pages are fetched with 'search' and 'search_next' on a
+        background thread, which stays up to prefetch pages ahead
+        of the caller.
+
+        Args:
+          prefetch  : number of pages fetched ahead of the one being consumed
+            type : int
+          max_pages : stop after this many pages
+            type : int
+          kwargs    : search arguments
+
+        Returns:
+          A generator of the objects returned by the server
+
+        Raises:
+          HttpException with the error message from the server
+        """
+        if prefetch < 1:
+            raise ValueError('prefetch must be at least 1')
+
+        pages = Queue()
+        # one slot per page fetched and not yet taken by the caller,
+        # claimed before the page is requested
+        slots = Queue(maxsize=prefetch)
+        stop = threading.Event()
+
+        def claim_slot():
+            # never blocks forever: the caller frees a slot when it stops
+            slots.put(None)
+            return not stop.is_set()
+
+        def fetch():
+            try:
+                page = None
+                count = 0
+                while claim_slot():
+                    page = self.search(**kwargs) if page is None else self.search_next(page)
+                    if not page:
+                        break
+                    count += 1
+                    pages.put(('page', page))
+                    if max_pages and count >= max_pages:
+                        break
+            except Exception:
+                pages.put(('error', sys.exc_info()))
+                return
+            pages.put(('done', None))
+
+        thread = threading.Thread(target=fetch)
+        thread.daemon = True
+        thread.start()
+        try:
+            while True:
+                kind, value = pages.get()
+                if kind == 'page':
+                    slots.get()
+                    for obj in value.get('objects', []):
+                        yield obj
+                elif kind == 'error':
+                    raise value[0], value[1], value[2]
+                else:
+                    return
+        finally:
+            # lets the fetch thread exit if the caller stopped early
+            stop.set()
+            try:
+                slots.get_nowait()
+            except Empty:
+                pass
+
+    def _stream(self, uri, chunk_size = 65536):
+        """
+        Send a GET request and return an ObjectStream over the body,
+        which is read from the socket as the stream is iterated.
+
+        httplib2 reads whole bodies, so streams use a connection of
+        their own rather than the pool. The rate limiter and retry
+        policy apply as for other requests, up to the status line;
+        cache, observers and records mode do not.
+        """
+        retry = self.retry
+        limiter = self.rate_limiter
+        scheme, netloc, path, query, _ = urlsplit(uri)
+        attempt = 0
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            if scheme == 'https':
+                conn = httplib.HTTPSConnection(netloc)
+            else:
+                conn = httplib.HTTPConnection(netloc)
+            try:
+                conn.request('GET', '%s?%s' % (path, query), headers={'Accept-Encoding': 'gzip'})
+                response = conn.getresponse()
+            except Exception as error:
+                conn.close()
+                if limiter is not None:
+                    limiter.failure()
+                if retry is None or attempt >= retry.max_retries or \
+                        not isinstance(error, retry.transport_errors):
+                    raise
+                time.sleep(retry.delay(attempt))
+                attempt += 1
+                continue
+
+            status = response.status
+            if status == 429 or status >= 500:
+                if limiter is not None:
+                    limiter.failure()
+                if retry is not None and retry.is_retryable_status(status) and \
+                        attempt < retry.max_retries:
+                    retry_after = response.getheader('retry-after')
+                    conn.close()
+                    time.sleep(retry.delay(attempt, retry_after))
+                    attempt += 1
+                    continue
+            elif limiter is not None:
+                limiter.success()
+            break
+
+        try:
+            gzipped = (response.getheader('content-encoding') or '').lower() == 'gzip'
+            if response.status != 200:
+                content = response.read()
+                if gzipped:
+                    content = zlib.decompress(content, 16 + zlib.MAX_WBITS)
+                self._parse_response(Response(response), content)
+        except Exception:
+            conn.close()
+            raise
+
+        read = response.read
+        if gzipped:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            def read(size):
+                while True:
+                    chunk = response.read(size)
+                    if not chunk:
+                        return decompressor.flush()
+                    data = decompressor.decompress(chunk)
+                    if data:
+                        return data
+        return ObjectStream(read, conn.close, chunk_size)
+
+    def stream_search(self, chunk_size = 65536, **kwargs):
+        """
+        Streaming counterpart of 'search' for large result pages.
+
+        Returns:
+          An ObjectStream; iterate it for the objects, its 'meta'
+          holds the pagination data. Pass it to stream_next for
+          the next page. Objects are always dictionaries, also in
+          records mode, and responses are not cached.
+
+        Raises:
+          HttpException with the error message from the server
+        """
+        return self._stream(self.prepare('search', **kwargs).uri, chunk_size)
+
+    def stream_next(self, stream, chunk_size = 65536):
+        """
+        Stream the page after the one read by stream, which must
+        have been iterated to the end. Returns None on the last page.
+        Objects are always dictionaries.
+        """
+        next = stream.meta.get('next')
+        if next is None:
+            return None
+        return self._stream(self.api_url % next, chunk_size)
+
+    def stream_details(self, ids, chunk_size = 65536):
+        """
+        Streaming counterpart of 'get_details', for detail payloads
+        with large menus. Objects are always dictionaries.
+        """
+        return self._stream(self._build_uri(self._id_param(ids)), chunk_size)
 
 ################################################################################
 
 class VenueApiClient(HttpApiClient):
 
-    def __init__(self, api_key):
-        self.api_url  = 'http://api.locu.com%s'
+    record_class = Venue
+    entity_kind = 'venue'
+
+    def __init__(self, api_key, api_url = 'http://api.locu.com%s', **kwargs):
+        # api_url can point at another server, ex a MockLocuServer
+        self.api_url  = api_url
         base_url = self.api_url % '/v1_0/venue/'
-        super(VenueApiClient, self).__init__(api_key, base_url)
+        super(VenueApiClient, self).__init__(api_key, base_url, **kwargs)
 
 
     def search(self, category = None, cuisine = None, location = (None, None), radius = None, tl_coord = (None, None), \
@@ -191,13 +805,23 @@ class VenueApiClient(HttpApiClient):
           HttpException with the error message from the server
         """
 
-        params = self._get_params(category = category, cuisine = cuisine, location = location, radius = radius, tl_coord = tl_coord, \
-                                      br_coord = br_coord, name = name, country = country, locality = locality, \
-                                      region = region, postal_code = postal_code, street_address = street_address, \
-                                      website_url = website_url, has_menu = has_menu, open_at = open_at)
+        params = self._search_params(category = category, cuisine = cuisine, location = location, radius = radius, tl_coord = tl_coord, \
+                                         br_coord = br_coord, name = name, country = country, locality = locality, \
+                                         region = region, postal_code = postal_code, street_address = street_address, \
+                                         website_url = website_url, has_menu = has_menu, open_at = open_at)
 
         return self._create_query('search', params)
 
+    def _search_params(self, category = None, cuisine = None, location = (None, None), radius = None, tl_coord = (None, None), \
+                           br_coord = (None, None), name = None, country = None, locality = None, \
+                           region = None, postal_code = None, street_address = None,\
+                           website_url = None, has_menu = None, open_at = None):
+        """Request parameters of search, shared with prepare."""
+        return self._get_params(category = category, cuisine = cuisine, location = location, radius = radius, tl_coord = tl_coord, \
+                                    br_coord = br_coord, name = name, country = country, locality = locality, \
+                                    region = region, postal_code = postal_code, street_address = street_address, \
+                                    website_url = website_url, has_menu = has_menu, open_at = open_at)
+
     def search_next(self, obj):
         """
         Takes the dictionary that is returned by 'search' or 'search_next' function and gets the next batch of results
@@ -213,12 +837,7 @@ class VenueApiClient(HttpApiClient):
         """
         if 'meta' in obj and 'next' in obj['meta'] and obj['meta']['next'] != None:
             uri = self.api_url % obj['meta']['next']
-            header, content = self._http_uri_request(uri)
-            resp = json.loads(content)
-            if not self._is_http_response_ok(header):
-                error = resp.get('error_message', 'Unknown Error')
-                raise HttpException(header.status, header.reason, error) 
-            return resp
+            return self._query(uri, 'next')
         return {}
 
     def insight(self, dimension, category = None, cuisine = None, location = (None, None), radius = None, tl_coord = (None,  None), \
@@ -270,45 +889,76 @@ class VenueApiClient(HttpApiClient):
           HttpException with the error message from the server
         """
 
-        params =  self._get_params(dimension = dimension, category = category, cuisine = cuisine, location = location, radius = radius, tl_coord = tl_coord, \
-                                         br_coord = br_coord, name = name, country = country, locality = locality, \
-                                         region = region, postal_code = postal_code, street_address = street_address, \
-                                         website_url = website_url, has_menu = has_menu, open_at = open_at)
+        params = self._insight_params(dimension = dimension, category = category, cuisine = cuisine, location = location, radius = radius, tl_coord = tl_coord, \
+                                          br_coord = br_coord, name = name, country = country, locality = locality, \
+                                          region = region, postal_code = postal_code, street_address = street_address, \
+                                          website_url = website_url, has_menu = has_menu, open_at = open_at)
 
         return self._create_query('insight', params)
 
+    def _insight_params(self, dimension, category = None, cuisine = None, location = (None, None), radius = None, tl_coord = (None,  None), \
+                            br_coord = (None, None), name = None, country = None, locality = None, \
+                            region = None, postal_code = None, street_address = None,\
+                            website_url = None, has_menu = None, open_at = None):
+        """Request parameters of insight, shared with prepare."""
+        return self._get_params(dimension = dimension, category = category, cuisine = cuisine, location = location, radius = radius, tl_coord = tl_coord, \
+                                    br_coord = br_coord, name = name, country = country, locality = locality, \
+                                    region = region, postal_code = postal_code, street_address = street_address, \
+                                    website_url = website_url, has_menu = has_menu, open_at = open_at)
+
+    def insight_many(self, specs, max_workers = 4, local = None):
+        """
+        Run several insight calls concurrently.
+
+        Args:
+          specs       : insight arguments, one dictionary per call.
+                        Ex [{'dimension': 'cuisine', 'locality': 'San Francisco'}, ...]
+            type : [dict]
+          max_workers : number of calls made at the same time
+            type : int
+          local       : object with an insight method answering venue
+                        specs without requests, such as a SpatialIndex
+                        holding every venue of interest. Specs it cannot
+                        answer (it raises ValueError) are sent to the server
+
+        Returns:
+          A dictionary with
+            'objects' : list of {'spec': spec, 'objects': counts by value},
+                        in the order of the given specs
+            'errors'  : list of {'spec': spec, 'error': exception} for
+                        every call that failed
+        """
+        results = [None] * len(specs)
+        if local is not None:
+            for i, spec in enumerate(specs):
+                try:
+                    results[i] = local.insight(**spec)
+                except ValueError:
+                    pass
+        return self._insight_many(specs, results, max_workers)
+
     def get_details(self, ids):
         """
         Locu Venue Details API Call Wrapper
 
         Args:
           list of ids : ids of a particular venues to get insights about. Can process up to 5 ids
+                        use get_details_bulk for more
           
 
         """
-        if isinstance(ids, list):
-            if len(ids) > 5:
-                ids = ids[:5]
-            id_param = ';'.join(ids) + '/'
-        else:
-            ids = str(ids)
-            id_param = ids + '/'
-
-        header, content = self._http_request(id_param)
-        resp = json.loads(content)
-        if not self._is_http_response_ok(header):
-            error = resp.get('error_message', 'Unknown Error')
-            raise HttpException(header.status, header.reason, error) 
-        return resp
+        return self._query(self._build_uri(self._id_param(ids)), 'details')
 
     def get_menus(self, id):
         """
         Given a venue id returns a list of menus associated with a venue
 
         """
-        resp = self.get_details([id])
+        return self._menus(self._stored_details(id, ('has_menu', 'menus')))
+
+    def _menus(self, objects):
         menus = []
-        for obj in resp['objects']:
+        for obj in objects:
             if obj['has_menu']:
                 menus += obj['menus']
         return menus
@@ -335,10 +985,12 @@ class VenueApiClient(HttpApiClient):
              time = time.strftime('%H:%M:%S',some_time_object)
 
       """
-      details = self.get_details(id)
+      return self._is_open(self._stored_details(id, ('open_hours',)), time, day)
+
+    def _is_open(self, objects, time, day):
       has_data = False
 
-      for obj in details["objects"]:
+      for obj in objects:
         hours = obj["open_hours"][day]
         if hours:
           has_data = True
@@ -355,13 +1007,41 @@ class VenueApiClient(HttpApiClient):
       else:
         return None
 
+    def hours_index(self, ids, max_workers = 4):
+        """
+        Fetch the details of the given venues and compile their
+        opening hours into an OpenHoursIndex, which answers is_open
+        for many venues or many times without further requests.
+
+        Args:
+          ids         : venue ids
+            type : [string]
+          max_workers : number of detail requests made at the same time
+            type : int
+
+        Raises:
+          the error of the first chunk of ids that could not be fetched,
+          as is_open of the index could not tell those venues from venues
+          without hours data. Use get_details_bulk and OpenHoursIndex to
+          keep what was fetched
+        """
+        resp = self.get_details_bulk(ids, max_workers = max_workers)
+        if resp['errors']:
+            raise resp['errors'][0]['error']
+        return OpenHoursIndex(resp['objects'])
+
 ################################################################################    
 
 class MenuItemApiClient(HttpApiClient):
-    def __init__(self, api_key):
-        self.api_url  = 'http://api.locu.com%s'
+
+    record_class = MenuItem
+    entity_kind = 'menu_item'
+
+    def __init__(self, api_key, api_url = 'http://api.locu.com%s', **kwargs):
+        # api_url can point at another server, ex a MockLocuServer
+        self.api_url  = api_url
         base_url = self.api_url % '/v1_0/menu_item/'
-        super(MenuItemApiClient, self).__init__(api_key, base_url)
+        super(MenuItemApiClient, self).__init__(api_key, base_url, **kwargs)
 
     def search(self, name = None, category = None, description = None, price = None, \
                    price__gt = None, price__gte = None, price__lt = None, price__lte = None, \
@@ -419,14 +1099,28 @@ class MenuItemApiClient(HttpApiClient):
           HttpException with the error message from the server
         """
 
-        params =  self._get_params( name = name, description = description, price = price, \
-                                       price__gt = price__gt, price__gte = price__gte, price__lt = price__lt, price__lte = price__lte, \
-                                       location = location, radius = radius, tl_coord = tl_coord, \
-                                       br_coord = br_coord, country = country, locality = locality, \
-                                       region = region, postal_code = postal_code, street_address = street_address,\
-                                       website_url = website_url)
+        params = self._search_params(name = name, category = category, description = description, price = price, \
+                                         price__gt = price__gt, price__gte = price__gte, price__lt = price__lt, price__lte = price__lte, \
+                                         location = location, radius = radius, tl_coord = tl_coord, \
+                                         br_coord = br_coord, country = country, locality = locality, \
+                                         region = region, postal_code = postal_code, street_address = street_address,\
+                                         website_url = website_url)
         return self._create_query('search', params)
 
+    def _search_params(self, name = None, category = None, description = None, price = None, \
+                           price__gt = None, price__gte = None, price__lt = None, price__lte = None, \
+                           location = (None, None), radius = None, tl_coord = (None, None), \
+                           br_coord = (None, None), country = None, locality = None, \
+                           region = None, postal_code = None, street_address = None, \
+                           website_url = None):
+        """Request parameters of search, shared with prepare. category is not sent."""
+        return self._get_params(name = name, description = description, price = price, \
+                                    price__gt = price__gt, price__gte = price__gte, price__lt = price__lt, price__lte = price__lte, \
+                                    location = location, radius = radius, tl_coord = tl_coord, \
+                                    br_coord = br_coord, country = country, locality = locality, \
+                                    region = region, postal_code = postal_code, street_address = street_address,\
+                                    website_url = website_url)
+
     def search_next(self, obj):
         """
         Takes the dictionary that is returned by 'search' or 'search_next' function and gets the next batch of results
@@ -442,12 +1136,7 @@ class MenuItemApiClient(HttpApiClient):
         """
         if 'meta' in obj and 'next' in obj['meta'] and obj['meta']['next'] != None:
             uri = self.api_url % obj['meta']['next']
-            header, content = self._http_uri_request(uri)
-            resp = json.loads(content)
-            if not self._is_http_response_ok(header):
-                error = resp.get('error_message', 'Unknown Error')
-                raise HttpException(header.status, header.reason, error) 
-            return resp
+            return self._query(uri, 'next')
         return {}
 
 
@@ -510,36 +1199,38 @@ class MenuItemApiClient(HttpApiClient):
           HttpException with the error message from the server
         """
 
-        params = self._get_params(name = name, category = category, description = description, price = price, \
-                                      price__gt = price__gt, price__gte = price__gte, price__lt = price__lt, price__lte = price__lte, \
-                                      location = location, radius = radius, tl_coord = tl_coord, \
-                                      br_coord = br_coord, country = country, locality = locality, \
-                                      region = region, postal_code = postal_code, street_address = street_address,\
-                                      website_url = website_url, dimension = dimension)
+        params = self._insight_params(dimension = dimension, name = name, category = category, description = description, price = price, \
+                                          price__gt = price__gt, price__gte = price__gte, price__lt = price__lt, price__lte = price__lte, \
+                                          location = location, radius = radius, tl_coord = tl_coord, \
+                                          br_coord = br_coord, country = country, locality = locality, \
+                                          region = region, postal_code = postal_code, street_address = street_address,\
+                                          website_url = website_url)
         return self._create_query('insight', params)
 
+    def _insight_params(self, dimension, name = None, category = None, description = None, price = None, \
+                            price__gt = None, price__gte = None, price__lt = None, price__lte = None, \
+                            location = (None, None), radius = None, tl_coord = (None, None), \
+                            br_coord = (None, None), country = None, locality = None, \
+                            region = None, postal_code = None, street_address = None,\
+                            website_url = None):
+        """Request parameters of insight, shared with prepare."""
+        return self._get_params(name = name, category = category, description = description, price = price, \
+                                    price__gt = price__gt, price__gte = price__gte, price__lt = price__lt, price__lte = price__lte, \
+                                    location = location, radius = radius, tl_coord = tl_coord, \
+                                    br_coord = br_coord, country = country, locality = locality, \
+                                    region = region, postal_code = postal_code, street_address = street_address,\
+                                    website_url = website_url, dimension = dimension)
+
     def get_details(self, ids):
         """
         Locu MenuItems Details API Call Wrapper
 
         Args:
           list of ids : ids of a particular menu items to get insights about. Can process up to 5 ids
+                        use get_details_bulk for more
           
 
         """
-        if isinstance(ids, list):
-            if len(ids) > 5:
-                ids = ids[:5]
-            id_param = ';'.join(ids) + '/'
-        else:
-            ids = str(ids)
-            id_param = ids + '/'
-
-        header, content = self._http_request(id_param)
-        resp = json.loads(content)
-        if not self._is_http_response_ok(header):
-            error = resp.get('error_message', 'Unknown Error')
-            raise HttpException(header.status, header.reason, error) 
-        return resp
+        return self._query(self._build_uri(self._id_param(ids)), 'details')
 
 ################################################################################
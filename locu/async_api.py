@@ -0,0 +1,142 @@
+import sys
+
+from api import VenueApiClient, MenuItemApiClient
+from pool import ConnectionPool
+from workers import Executor, Future
+
+__all__ = [
+    'AsyncVenueApiClient',
+    'AsyncMenuItemApiClient',
+]
+
+################################################################################
+
+def _then(future, fn):
+    """Future of fn(future.result()), run when future finishes."""
+    chained = Future()
+    def done(future):
+        try:
+            chained.set_result(fn(future.result()))
+        except Exception:
+            chained.set_exception(sys.exc_info())
+    future.add_done_callback(done)
+    return chained
+
+################################################################################
+
+class AsyncApiClient(object):
+    """
+    Non-blocking counterpart of an api client.
+
+    Every call is scheduled on a bounded pool of worker threads and
+    returns a Future right away; call result() on it to get the data.
+    Workers share one pool of keep-alive connections, sized to the
+    number of requests allowed in flight at once.
+
+    The wrapped client does the parameter building and error handling,
+    so arguments and results are the same as for the blocking client.
+    Invalid arguments raise right away rather than through the Future.
+    """
+
+    client_class = None
+
+    def __init__(self, api_key, max_concurrency = 10, executor = None, **kwargs):
+        """
+        Args:
+          api_key         : MenuPlatform API key
+          max_concurrency : maximum number of requests in flight
+          executor        : Executor to share between several clients,
+                            max_concurrency is ignored when given
+          kwargs          : passed on to the blocking client. Ex cache, coalesce
+        """
+        if 'pool' not in kwargs:
+            kwargs['pool'] = ConnectionPool(max_concurrency)
+        self.client = self.client_class(api_key, **kwargs)
+        self._owns_executor = executor is None
+        self.executor = executor or Executor(max_concurrency)
+
+    def _submit_uri(self, uri, endpoint, key = None):
+        """
+        Future of the parsed response of uri. With coalescing on,
+        identical pending requests share one Future and hold no worker;
+        they are keyed like the client's own requests and are not
+        coalesced a second time by it.
+        """
+        client = self.client
+        if client.coalescer is None:
+            return self.executor.submit(client._query, uri, endpoint, key)
+        if key is None:
+            key = client._cache_key(uri)
+        return client.coalescer.submit(key, self.executor, client._query_uncoalesced, uri, endpoint, key)
+
+    def search(self, **kwargs):
+        """Future of client.search(**kwargs)"""
+        return self.execute(self.client.prepare('search', **kwargs))
+
+    def search_next(self, obj):
+        """Future of client.search_next(obj)"""
+        next = obj.get('meta', {}).get('next')
+        if next is None:
+            future = Future()
+            future.set_result({})
+            return future
+        return self._submit_uri(self.client.api_url % next, 'next')
+
+    def insight(self, dimension, **kwargs):
+        """Future of client.insight(dimension, **kwargs)"""
+        return self.execute(self.client.prepare('insight', dimension = dimension, **kwargs))
+
+    def get_details(self, ids):
+        """Future of client.get_details(ids)"""
+        client = self.client
+        return self._submit_uri(client._build_uri(client._id_param(ids)), 'details')
+
+    def execute(self, query):
+        """Future of client.execute(query), query made by client.prepare"""
+        return self._submit_uri(query.uri, query.endpoint, query.key)
+
+    def close(self):
+        """Stop the worker threads if this client created them."""
+        if self._owns_executor:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+################################################################################
+
+class AsyncVenueApiClient(AsyncApiClient):
+
+    client_class = VenueApiClient
+
+    def _details_then(self, id, fields, fn):
+        """
+        Future of fn(details objects of venue id). It is chained on the
+        get_details Future rather than waiting for it in a worker, which
+        could wait forever on a coalesced request queued behind it.
+        """
+        objects = self.client._stored(id, fields)
+        if objects is not None:
+            future = Future()
+            future.set_result(fn(objects))
+            return future
+        return _then(self.get_details(id), lambda resp: fn(resp['objects']))
+
+    def get_menus(self, id):
+        """Future of client.get_menus(id)"""
+        return self._details_then(id, ('has_menu', 'menus'), self.client._menus)
+
+    def is_open(self, id, time, day):
+        """Future of client.is_open(id, time, day)"""
+        return self._details_then(id, ('open_hours',),
+                                  lambda objects: self.client._is_open(objects, time, day))
+
+################################################################################
+
+class AsyncMenuItemApiClient(AsyncApiClient):
+
+    client_class = MenuItemApiClient
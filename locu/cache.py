@@ -0,0 +1,296 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+try:
+    import simplejson as json
+except :
+    import json
+
+from httplib2 import Response
+
+__all__ = [
+    'ResponseCache',
+    'SqliteCache',
+    'ValidatorStore',
+]
+
+################################################################################
+
+class ResponseCache(object):
+    """
+    In-memory response cache with LRU eviction and per-endpoint TTLs.
+
+    Endpoints are the kinds of calls made by the api clients:
+    'search', 'insight', 'details' and 'next' (a search_next page).
+    """
+
+    def __init__(self, max_size = 1024, ttl = 300, ttls = None):
+        """
+        Args:
+          max_size : maximum number of responses kept
+            type : int
+          ttl      : default number of seconds a response stays valid
+            type : float
+          ttls     : per endpoint TTL overrides. Ex {'details': 3600}
+            type : dict
+        """
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+        self.max_size = max_size
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires is not None and expires <= time.time():
+                self.expirations += 1
+                self.misses += 1
+                return None
+            # re-insert to mark as most recently used
+            self._entries[key] = entry
+            self.hits += 1
+            return value
+
+    def set(self, key, value, endpoint = None):
+        ttl = self.ttls.get(endpoint, self.ttl)
+        if ttl is not None and ttl <= 0:
+            return
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, value)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'size': len(self._entries),
+        }
+
+################################################################################
+
+class SqliteCache(object):
+    """
+    Persistent response cache stored in an sqlite database.
+
+    Any number of processes on a host can share one file: sqlite
+    handles the locking and each thread/process opens its own
+    connection. Responses are stored zlib-compressed with an expiry
+    time; when the compressed contents grow past max_bytes the least
+    recently used responses are evicted.
+
+    Has the same interface and TTL settings as ResponseCache and
+    stores the (header, content) pairs of the api clients.
+    """
+
+    # how many writes happen between two size checks
+    CHECK_EVERY = 64
+    # last access times are only rewritten when older than this
+    TOUCH_AFTER = 60
+
+    def __init__(self, path, max_bytes = 256 * 1024 * 1024, ttl = 300, ttls = None, \
+                     compress_level = 6):
+        """
+        Args:
+          path           : database file, created if missing
+          max_bytes      : cap on the total compressed size of the responses
+            type : int
+          ttl            : default number of seconds a response stays valid
+            type : float
+          ttls           : per endpoint TTL overrides. Ex {'details': 3600}
+            type : dict
+          compress_level : zlib compression level
+            type : int
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.compress_level = compress_level
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        with self._db() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS responses ('
+                       'key TEXT PRIMARY KEY, expires REAL, accessed REAL, '
+                       'size INTEGER, header TEXT, content BLOB)')
+            db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        # connections must not be carried over a fork
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def __len__(self):
+        return self._db().execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def get(self, key):
+        """Return the cached (header, content) for key, or None if missing or expired."""
+        db = self._db()
+        row = db.execute('SELECT expires, accessed, header, content FROM responses WHERE key = ?',
+                         (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        expires, accessed, header, content = row
+        now = time.time()
+        if expires is not None and expires <= now:
+            with db:
+                db.execute('DELETE FROM responses WHERE key = ? AND expires <= ?', (key, now))
+            self.expirations += 1
+            self.misses += 1
+            return None
+        if now - accessed > self.TOUCH_AFTER:
+            with db:
+                db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+        self.hits += 1
+        return Response(json.loads(header)), zlib.decompress(content)
+
+    def set(self, key, value, endpoint = None):
+        ttl = self.ttls.get(endpoint, self.ttl)
+        if ttl is not None and ttl <= 0:
+            return
+        header, content = value
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+        blob = zlib.compress(content, self.compress_level)
+        db = self._db()
+        with db:
+            db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                       (key, expires, now, len(blob), json.dumps(dict(header)), sqlite3.Binary(blob)))
+        self._writes += 1
+        if self._writes % self.CHECK_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop expired responses, then the least recently used ones above max_bytes."""
+        db = self._db()
+        with db:
+            db.execute('DELETE FROM responses WHERE expires <= ?', (time.time(),))
+            total = db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            excess = total - self.max_bytes
+            keys = []
+            for key, size in db.execute('SELECT key, size FROM responses ORDER BY accessed'):
+                keys.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            db.executemany('DELETE FROM responses WHERE key = ?', keys)
+        self.evictions += len(keys)
+
+    def delete(self, key):
+        db = self._db()
+        with db:
+            db.execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def clear(self):
+        db = self._db()
+        with db:
+            db.execute('DELETE FROM responses')
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'size': len(self),
+        }
+
+################################################################################
+
+class ValidatorStore(object):
+    """
+    Last response of each url together with its ETag and
+    Last-Modified validators, so a request can be sent as a
+    conditional GET and a 304 answered from the stored copy.
+    Keeps up to max_size responses, least recently used first out.
+    """
+
+    def __init__(self, max_size = 10000):
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.revalidated = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def headers(self, key):
+        """Conditional request headers for key, empty if nothing is stored."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        header = entry[0]
+        headers = {}
+        if 'etag' in header:
+            headers['if-none-match'] = header['etag']
+        if 'last-modified' in header:
+            headers['if-modified-since'] = header['last-modified']
+        return headers
+
+    def get(self, key):
+        """The stored (header, content) for key, after a 304 for it."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._entries[key] = entry
+            self.revalidated += 1
+            return entry
+
+    def set(self, key, header, content):
+        """Store a 200 response if it carries validators."""
+        if 'etag' not in header and 'last-modified' not in header:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (header, content)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
@@ -0,0 +1,87 @@
+import sys
+import threading
+
+from workers import Future
+
+__all__ = [
+    'SingleFlight',
+]
+
+################################################################################
+
+class SingleFlight(object):
+    """
+    Coalesces concurrent identical calls.
+
+    While a call for a key is running, later calls for the same key
+    do not run; they wait for the running call and get its result
+    (or its exception). Results are shared, not copied, so callers
+    should not modify them.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def _join(self, key):
+        """Return (future, leader) for key."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.calls += 1
+            return future, True
+
+    def _run(self, key, future, fn, args, kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            exc_info = sys.exc_info()
+            with self._lock:
+                del self._calls[key]
+            future.set_exception(exc_info)
+        else:
+            with self._lock:
+                del self._calls[key]
+            future.set_result(result)
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Call fn(*args, **kwargs) unless a call for key is already
+        running, and return the result of whichever call ran.
+        """
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn, args, kwargs)
+        return future.result()
+
+    def submit(self, key, executor, fn, *args, **kwargs):
+        """
+        Future-based counterpart of do: schedules fn on executor unless
+        a call for key is already pending, and returns the shared Future.
+        Waiters do not hold a worker thread.
+        """
+        future, leader = self._join(key)
+        if leader:
+            try:
+                executor.submit(self._run, key, future, fn, args, kwargs)
+            except Exception:
+                # nothing will run the call, release the key and its waiters
+                exc_info = sys.exc_info()
+                with self._lock:
+                    del self._calls[key]
+                future.set_exception(exc_info)
+                raise exc_info[0], exc_info[1], exc_info[2]
+        return future
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls),
+            }
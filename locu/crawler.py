@@ -0,0 +1,180 @@
+import os
+from Queue import Queue
+
+try:
+    import simplejson as json
+except :
+    import json
+
+from workers import Executor
+
+__all__ = [
+    'RegionCrawler',
+]
+
+################################################################################
+
+class RegionCrawler(object):
+    """
+    Collects every venue inside a bounding box.
+
+    The box is searched as a tile; a tile whose results are capped
+    (it returned 'saturation' venues, or still had more pages after
+    max_pages) is split into four tiles that are searched in turn.
+    Tiles are searched concurrently and venues are deduplicated by id.
+
+    With a checkpoint file the crawl state is saved as it goes, and a
+    new crawler given the same file picks up where the last one stopped.
+    The file is a log of JSON lines: the venues of every searched tile
+    are appended as they arrive, and the pending tiles every
+    checkpoint_every tiles, so saving costs the same late in a large
+    crawl as early on.
+    """
+
+    def __init__(self, client, tl_coord, br_coord, max_workers = 4, saturation = 25, \
+                     max_pages = 1, min_tile_size = 0.0005, checkpoint = None, checkpoint_every = 10, **search_kwargs):
+        """
+        Args:
+          client           : VenueApiClient or MenuItemApiClient
+          tl_coord         : (latitude, longtitude) of the top left corner
+          br_coord         : (latitude, longtitude) of the bottom right corner
+          max_workers      : number of tiles searched at the same time
+          saturation       : number of results that means a tile was capped
+          max_pages        : pages fetched per tile with search_next
+          min_tile_size    : tiles smaller than this (in degrees) are not split,
+                             capped ones are listed in self.truncated
+          checkpoint       : path of the file the crawl state is saved to
+          checkpoint_every : save the state after this many tiles
+          search_kwargs    : extra search filters. Ex category = ['restaurant']
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.saturation = saturation
+        self.max_pages = max_pages
+        self.min_tile_size = min_tile_size
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.search_kwargs = search_kwargs
+
+        self.venues = {}
+        self.errors = []
+        # capped tiles too small to split, some of their venues are missing
+        self.truncated = []
+        self.tiles_done = 0
+        self._pending = [(tl_coord[0], tl_coord[1], br_coord[0], br_coord[1])]
+        if checkpoint and os.path.exists(checkpoint):
+            self._load()
+
+    def _load(self):
+        with open(self.checkpoint) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # last line cut short by a crash
+                    continue
+                self.venues.update(record.get('venues', {}))
+                if 'pending' in record:
+                    self._pending = [tuple(tile) for tile in record['pending']]
+                    self.truncated = [tuple(tile) for tile in record.get('truncated', [])]
+                    self.tiles_done = record.get('tiles_done', 0)
+
+    def _append(self, f, record, sync = False):
+        # venues may be records when the client returns them
+        f.write(json.dumps(record, default=lambda record: record.to_dict()) + '\n')
+        f.flush()
+        if sync:
+            os.fsync(f.fileno())
+
+    def _save(self, f, pending):
+        state = {
+            'pending': pending,
+            'truncated': self.truncated,
+            'tiles_done': self.tiles_done,
+        }
+        # venues were appended before, the state only counts once they are on disk
+        self._append(f, state, sync = True)
+
+    def _search_tile(self, tile):
+        tl_lat, tl_long, br_lat, br_long = tile
+        page = self.client.search(tl_coord = (tl_lat, tl_long), br_coord = (br_lat, br_long), \
+                                      **self.search_kwargs)
+        objects = list(page.get('objects', []))
+        pages = 1
+        while pages < self.max_pages and page.get('meta', {}).get('next'):
+            page = self.client.search_next(page)
+            objects += page.get('objects', [])
+            pages += 1
+        saturated = bool(page.get('meta', {}).get('next')) or \
+            len(page.get('objects', [])) >= self.saturation
+        return objects, saturated
+
+    def _split(self, tile):
+        tl_lat, tl_long, br_lat, br_long = tile
+        if abs(tl_lat - br_lat) / 2 < self.min_tile_size or abs(br_long - tl_long) / 2 < self.min_tile_size:
+            return []
+        mid_lat = (tl_lat + br_lat) / 2.0
+        mid_long = (tl_long + br_long) / 2.0
+        return [
+            (tl_lat, tl_long, mid_lat, mid_long),
+            (tl_lat, mid_long, mid_lat, br_long),
+            (mid_lat, tl_long, br_lat, mid_long),
+            (mid_lat, mid_long, br_lat, br_long),
+        ]
+
+    def crawl(self):
+        """
+        Run the crawl until no tiles are left.
+
+        Returns:
+          A dictionary of venue id -> venue. Tiles that failed are
+          listed in self.errors and kept in the checkpoint so a
+          later run tries them again. Capped tiles that could not
+          be split any further are listed in self.truncated.
+        """
+        done = Queue()
+        in_flight = set()
+        failed = []
+        executor = Executor(self.max_workers)
+        log = open(self.checkpoint, 'a') if self.checkpoint else None
+
+        def submit(tile):
+            in_flight.add(tile)
+            future = executor.submit(self._search_tile, tile)
+            future.add_done_callback(lambda f: done.put((tile, f)))
+
+        try:
+            for tile in self._pending:
+                submit(tile)
+            since_save = 0
+            while in_flight:
+                tile, future = done.get()
+                in_flight.discard(tile)
+                error = future.exception()
+                if error is not None:
+                    self.errors.append({'tile': tile, 'error': error})
+                    failed.append(tile)
+                else:
+                    objects, saturated = future.result()
+                    for obj in objects:
+                        self.venues[obj['id']] = obj
+                    if log is not None and objects:
+                        self._append(log, {'venues': dict((obj['id'], obj) for obj in objects)})
+                    self.tiles_done += 1
+                    if saturated:
+                        children = self._split(tile)
+                        if not children:
+                            self.truncated.append(tile)
+                        for child in children:
+                            submit(child)
+                since_save += 1
+                if log is not None and since_save >= self.checkpoint_every:
+                    self._save(log, list(in_flight) + failed)
+                    since_save = 0
+        finally:
+            executor.shutdown(wait=not in_flight)
+            self._pending = list(in_flight) + failed
+            if log is not None:
+                self._save(log, self._pending)
+                log.close()
+        return self.venues
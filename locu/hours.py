@@ -0,0 +1,201 @@
+from array import array
+from bisect import bisect_right
+
+__all__ = [
+    'OpenHoursIndex',
+    'minute_of_week',
+]
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+################################################################################
+
+def _parse_time(value):
+    """'09:30:00' or '09:30' -> minutes since midnight"""
+    parts = value.strip().split(':')
+    return int(parts[0]) * 60 + int(parts[1])
+
+def minute_of_week(time, day = None):
+    """
+    Convert a time to minutes since Monday 00:00.
+
+    Args:
+      time : string of the format ex: "12:00:00", or a datetime
+      day  : string of weekday ex: "Monday", not needed for a datetime
+    """
+    if day is None:
+        return time.weekday() * MINUTES_PER_DAY + time.hour * 60 + time.minute
+    return DAYS.index(day) * MINUTES_PER_DAY + _parse_time(time)
+
+def _compile(open_hours):
+    """
+    Turn the open_hours of a venue into sorted, merged
+    [start, end) minute-of-week intervals and a bit mask
+    of the days that have hours data.
+    """
+    intervals = []
+    days_mask = 0
+    for day_index, day in enumerate(DAYS):
+        hours = (open_hours or {}).get(day)
+        if not hours:
+            continue
+        days_mask |= 1 << day_index
+        day_start = day_index * MINUTES_PER_DAY
+        for interval in hours:
+            open_time, close_time = interval.replace(' ', '').split('-')
+            start = day_start + _parse_time(open_time)
+            end = day_start + _parse_time(close_time)
+            if end <= start:
+                # closes after midnight
+                end += MINUTES_PER_DAY
+            if end > MINUTES_PER_WEEK:
+                # Sunday night into Monday morning
+                intervals.append((0, end - MINUTES_PER_WEEK))
+                end = MINUTES_PER_WEEK
+            intervals.append((start, end))
+
+    intervals.sort()
+    starts = array('i')
+    ends = array('i')
+    for start, end in intervals:
+        if ends and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends, days_mask
+
+################################################################################
+
+class OpenHoursIndex(object):
+    """
+    Opening hours of many venues, parsed once into integer
+    minute-of-week intervals so checks need no requests or
+    string handling.
+
+    Intervals are closed at the opening minute and open at the
+    closing minute. Hours that close at or before they open run
+    past midnight into the next day.
+    """
+
+    # size of the buckets used to answer 'which venues are open' queries
+    BUCKET_MINUTES = 60
+
+    def __init__(self, venues = None):
+        self._venues = {}
+        self._buckets = None
+        if venues:
+            self.add_many(venues)
+
+    def __len__(self):
+        return len(self._venues)
+
+    def __contains__(self, id):
+        return id in self._venues
+
+    def add(self, venue):
+        """Add or replace a venue dictionary as returned by get_details."""
+        self._venues[venue['id']] = _compile(venue.get('open_hours'))
+        self._buckets = None
+
+    def add_many(self, venues):
+        for venue in venues:
+            self.add(venue)
+
+    def remove(self, id):
+        if self._venues.pop(id, None) is not None:
+            self._buckets = None
+
+    def _lookup(self, compiled, minute, day_index):
+        starts, ends, days_mask = compiled
+        i = bisect_right(starts, minute) - 1
+        if i >= 0 and minute < ends[i]:
+            return True
+        if days_mask & (1 << day_index):
+            return False
+        return None
+
+    def is_open(self, id, time, day = None):
+        """
+        Counterpart of VenueApiClient.is_open, without a request.
+
+        Answers differ at the edges: a venue counts as open from its
+        opening minute on (the client needs a time strictly after the
+        opening time), and hours running past midnight are followed
+        into the next day (the client compares time strings within
+        one day only).
+
+        Returns:
+          Bool if there is hours data available
+          None otherwise, or if the venue is not in the index
+        """
+        compiled = self._venues.get(id)
+        if compiled is None:
+            return None
+        minute = minute_of_week(time, day)
+        return self._lookup(compiled, minute, minute // MINUTES_PER_DAY)
+
+    def is_open_at(self, id, times):
+        """
+        Check one venue at many times.
+
+        Args:
+          id    : venue id
+          times : list of datetimes or (time, day) tuples
+
+        Returns:
+          A list of True, False or None, one per time
+        """
+        compiled = self._venues.get(id)
+        results = []
+        for time in times:
+            if compiled is None:
+                results.append(None)
+                continue
+            if isinstance(time, tuple):
+                minute = minute_of_week(*time)
+            else:
+                minute = minute_of_week(time)
+            results.append(self._lookup(compiled, minute, minute // MINUTES_PER_DAY))
+        return results
+
+    def _build_buckets(self):
+        buckets = [[] for _ in xrange(MINUTES_PER_WEEK // self.BUCKET_MINUTES)]
+        for id, (starts, ends, _) in self._venues.iteritems():
+            for start, end in zip(starts, ends):
+                first = start // self.BUCKET_MINUTES
+                last = (end - 1) // self.BUCKET_MINUTES
+                for b in xrange(first, last + 1):
+                    buckets[b].append((start, end, id))
+        self._buckets = buckets
+
+    def open_venues(self, time, day = None):
+        """
+        Return the set of ids of the venues open at the given time.
+
+        Only the venues with an interval overlapping the hour of the
+        query are looked at, so the cost follows the number of
+        venues open around that time rather than the index size.
+        """
+        if self._buckets is None:
+            self._build_buckets()
+        minute = minute_of_week(time, day)
+        return set(id for start, end, id in self._buckets[minute // self.BUCKET_MINUTES]
+                   if start <= minute < end)
+
+    def open_status(self, ids, time, day = None):
+        """
+        Check many venues at one time.
+
+        Returns:
+          A dictionary of id -> True, False or None
+        """
+        minute = minute_of_week(time, day)
+        day_index = minute // MINUTES_PER_DAY
+        results = {}
+        for id in ids:
+            compiled = self._venues.get(id)
+            results[id] = None if compiled is None else self._lookup(compiled, minute, day_index)
+        return results
@@ -0,0 +1,225 @@
+import re
+import threading
+import unicodedata
+
+__all__ = [
+    'NameIndex',
+]
+
+# words spelled several ways in names and street addresses
+ABBREVIATIONS = {
+    '&': 'and',
+    'st': 'street',
+    'ave': 'avenue',
+    'av': 'avenue',
+    'blvd': 'boulevard',
+    'rd': 'road',
+    'dr': 'drive',
+    'ln': 'lane',
+    'hwy': 'highway',
+    'n': 'north',
+    's': 'south',
+    'e': 'east',
+    'w': 'west',
+}
+
+_SEPARATORS = re.compile(r'[^a-z0-9&]+')
+
+# share of the query trigrams a candidate needs to be considered
+MIN_OVERLAP = 0.5
+
+################################################################################
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation, expand abbreviations."""
+    if not text:
+        return ''
+    if isinstance(text, str):
+        text = text.decode('utf-8', 'ignore')
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').lower()
+    text = text.replace("'", '')
+    return ' '.join(ABBREVIATIONS.get(word, word) for word in _SEPARATORS.split(text.replace('&', ' & ')) if word)
+
+def trigrams(text):
+    """Trigrams of every word of a normalized text, padded so prefixes count."""
+    grams = set()
+    for word in text.split():
+        word = '  ' + word + ' '
+        for i in xrange(len(word) - 2):
+            grams.add(word[i:i + 3])
+    return grams
+
+def _similarity(query, grams):
+    """
+    Mean of the share of query trigrams found in grams, which keeps
+    partially typed names high, and of their Dice coefficient, which
+    ranks the closest full match first.
+    """
+    if not query or not grams:
+        return 0.0
+    common = len(query & grams)
+    return 0.5 * common / len(query) + float(common) / (len(query) + len(grams))
+
+################################################################################
+
+class NameIndex(object):
+    """
+    Trigram index over the names and addresses of fetched venues.
+
+    Resolves a typed venue name, optionally with locality, street
+    address or postal code, into ranked candidates without a search
+    request. resolve() falls back to VenueApiClient.search when no
+    candidate is good enough and indexes what it returns.
+    """
+
+    def __init__(self, venues = None, threshold = 0.8, min_overlap = MIN_OVERLAP):
+        """
+        Args:
+          venues      : venue dictionaries to index
+          threshold   : score from 0 to 1 a candidate needs for resolve()
+                        to skip the search request
+            type : float
+          min_overlap : share of the typed name trigrams a venue name must
+                        contain to be a candidate
+            type : float
+        """
+        self.threshold = threshold
+        self.min_overlap = min_overlap
+        self._venues = {}
+        self._entries = {}
+        self._names = {}
+        self._addresses = {}
+        self._lock = threading.Lock()
+        if venues:
+            self.add_many(venues)
+
+    def __len__(self):
+        return len(self._venues)
+
+    def __contains__(self, id):
+        return id in self._venues
+
+    def add(self, venue):
+        """
+        Add or replace a venue dictionary as returned by search or
+        get_details. Venues without a name are ignored.
+        """
+        name = trigrams(normalize(venue.get('name')))
+        if not name:
+            return
+        address = trigrams(normalize(venue.get('street_address')))
+        locality = normalize(venue.get('locality'))
+        entry = (name, address, locality, (venue.get('postal_code') or '').strip())
+        with self._lock:
+            self._remove(venue['id'])
+            self._venues[venue['id']] = venue
+            self._entries[venue['id']] = entry
+            # postings are kept for all venues and per locality
+            for grams, postings in ((name, self._names), (address, self._addresses)):
+                for gram in grams:
+                    postings.setdefault((None, gram), set()).add(venue['id'])
+                    postings.setdefault((locality, gram), set()).add(venue['id'])
+
+    def add_many(self, venues):
+        for venue in venues:
+            self.add(venue)
+
+    def add_response(self, resp):
+        """Add the objects of a search or get_details response."""
+        self.add_many(resp.get('objects', []))
+
+    def remove(self, id):
+        with self._lock:
+            self._remove(id)
+
+    def _remove(self, id):
+        if self._venues.pop(id, None) is None:
+            return
+        name, address, locality = self._entries.pop(id)[:3]
+        for grams, postings in ((name, self._names), (address, self._addresses)):
+            for gram in grams:
+                for key in ((None, gram), (locality, gram)):
+                    ids = postings[key]
+                    ids.discard(id)
+                    if not ids:
+                        del postings[key]
+
+    def _candidates(self, postings, query, locality):
+        """
+        Ids sharing at least min_overlap of the query trigrams. Such a
+        venue has one of the len(query) - needed + 1 rarest trigrams,
+        so the long postings of common trigrams are never read.
+        """
+        lists = sorted((postings.get((locality, gram), ()) for gram in query), key=len)
+        needed = max(1, int(len(query) * self.min_overlap))
+        candidates = set()
+        for ids in lists[:len(query) - needed + 1]:
+            candidates.update(ids)
+        return candidates
+
+    def lookup(self, name, locality = None, street_address = None, postal_code = None, limit = 10):
+        """
+        Rank indexed venues against a typed name.
+
+        Args:
+          name           : venue name, possibly partial or misspelled
+            type : string
+          locality       : only consider venues of this locality
+            type : string
+          street_address : street address, weighs in the score
+            type : string
+          postal_code    : postal code, exact matches score higher
+            type : string
+          limit          : maximum number of candidates returned
+            type : int
+
+        Returns:
+          A list of (score, venue) tuples, best first, with scores from 0 to 1
+        """
+        query = trigrams(normalize(name))
+        address_query = trigrams(normalize(street_address))
+        locality = normalize(locality) or None
+        postal_code = postal_code.strip() if postal_code else None
+        if not query:
+            return []
+
+        with self._lock:
+            candidates = self._candidates(self._names, query, locality)
+            if address_query:
+                candidates.update(self._candidates(self._addresses, address_query, locality))
+
+            ranked = []
+            for id in candidates:
+                names, addresses, venue_locality, venue_postal_code = self._entries[id]
+                score = _similarity(query, names)
+                if address_query:
+                    score = 0.7 * score + 0.3 * _similarity(address_query, addresses)
+                if postal_code:
+                    score = 0.9 * score + (0.1 if venue_postal_code == postal_code else 0.0)
+                ranked.append((score, self._venues[id]))
+
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return ranked[:limit] if limit else ranked
+
+    def resolve(self, client, name, locality = None, street_address = None, postal_code = None, \
+                    limit = 10, **search_kwargs):
+        """
+        lookup() backed by VenueApiClient.search.
+
+        Searches upstream only when the best local candidate scores
+        below the threshold; the venues found are added to the index
+        and ranked with the local ones.
+
+        Args:
+          client        : VenueApiClient used for the fallback search
+          search_kwargs : other search filters. Ex region = 'CA'
+
+        Returns:
+          A list of venues, best first
+        """
+        ranked = self.lookup(name, locality, street_address, postal_code, limit)
+        if not ranked or ranked[0][0] < self.threshold:
+            self.add_response(client.search(name = name, locality = locality, postal_code = postal_code, \
+                                                **search_kwargs))
+            ranked = self.lookup(name, locality, street_address, postal_code, limit)
+        return [venue for score, venue in ranked]
@@ -0,0 +1,136 @@
+import threading
+import time
+from bisect import bisect_left
+
+__all__ = [
+    'Metrics',
+]
+
+# upper bounds of the latency buckets, in milliseconds
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float('inf'))
+TIMINGS = ('total', 'wait', 'transfer', 'decode', 'convert')
+
+################################################################################
+
+class _Stats(object):
+    __slots__ = ('count', 'errors', 'cache_hits', 'retries', 'bytes', 'histograms')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.bytes = 0
+        self.histograms = dict((timing, [0] * len(BUCKETS)) for timing in TIMINGS)
+
+    def add(self, event):
+        self.count += 1
+        if event['error'] is not None or (event['status'] or 200) >= 400:
+            self.errors += 1
+        if event['cache'] == 'hit':
+            self.cache_hits += 1
+        self.retries += event['retries']
+        self.bytes += event['bytes']
+        for timing in TIMINGS:
+            self.histograms[timing][bisect_left(BUCKETS, event[timing] * 1000)] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.errors += other.errors
+        self.cache_hits += other.cache_hits
+        self.retries += other.retries
+        self.bytes += other.bytes
+        for timing in TIMINGS:
+            counts = self.histograms[timing]
+            for i, n in enumerate(other.histograms[timing]):
+                counts[i] += n
+
+
+def _percentile(counts, fraction):
+    """Upper bound of the bucket holding the given fraction of the samples."""
+    total = sum(counts)
+    if not total:
+        return None
+    seen = 0
+    for bound, n in zip(BUCKETS, counts):
+        seen += n
+        if seen >= fraction * total:
+            return bound
+    return BUCKETS[-1]
+
+################################################################################
+
+class Metrics(object):
+    """
+    Request observer keeping rolling per-endpoint statistics.
+
+    Add it to a client with add_observer (or observers = [metrics]).
+    Events are counted in time slots; snapshot() combines the slots
+    of the last 'window' seconds into latency histograms, percentiles
+    and counters ready to export to a metrics system.
+    """
+
+    def __init__(self, window = 60, slots = 6):
+        """
+        Args:
+          window : seconds of history covered by snapshot()
+          slots  : number of slots the window is divided into
+        """
+        self.window = window
+        self.slot_length = float(window) / slots
+        self._slots = [(None, {}) for _ in xrange(slots)]
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        epoch = int(event['time'] // self.slot_length)
+        index = epoch % len(self._slots)
+        with self._lock:
+            slot_epoch, stats = self._slots[index]
+            if slot_epoch != epoch:
+                stats = {}
+                self._slots[index] = (epoch, stats)
+            endpoint_stats = stats.get(event['endpoint'])
+            if endpoint_stats is None:
+                endpoint_stats = stats[event['endpoint']] = _Stats()
+            endpoint_stats.add(event)
+
+    def snapshot(self, now = None):
+        """
+        Returns:
+          A dictionary of endpoint -> {
+            'count', 'errors', 'cache_hits', 'retries', 'bytes',
+            'total', 'wait', 'transfer', 'decode', 'convert' : {
+                'buckets' : list of (upper bound in ms, count),
+                'p50', 'p90', 'p99' : upper bound of the bucket in ms
+            }
+          }
+        """
+        now = time.time() if now is None else now
+        oldest = int(now // self.slot_length) - len(self._slots) + 1
+        combined = {}
+        with self._lock:
+            for epoch, stats in self._slots:
+                if epoch is None or epoch < oldest:
+                    continue
+                for endpoint, endpoint_stats in stats.iteritems():
+                    combined.setdefault(endpoint, _Stats()).merge(endpoint_stats)
+
+        result = {}
+        for endpoint, stats in combined.iteritems():
+            data = {
+                'count': stats.count,
+                'errors': stats.errors,
+                'cache_hits': stats.cache_hits,
+                'retries': stats.retries,
+                'bytes': stats.bytes,
+            }
+            for timing in TIMINGS:
+                counts = stats.histograms[timing]
+                data[timing] = {
+                    'buckets': zip(BUCKETS, counts),
+                    'p50': _percentile(counts, 0.5),
+                    'p90': _percentile(counts, 0.9),
+                    'p99': _percentile(counts, 0.99),
+                }
+            result[endpoint] = data
+        return result
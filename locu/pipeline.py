@@ -0,0 +1,216 @@
+"""
+Bulk hydration of venue details across processes.
+
+    python -m locu.pipeline --key KEY --ids ids.txt --output venues.ndjson \
+        --checkpoint done.txt --processes 8 --threads 8
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import time
+
+try:
+    import simplejson as json
+except :
+    import json
+
+# absolute import so the module also runs with python -m
+from locu.api import VenueApiClient
+
+__all__ = [
+    'hydrate',
+]
+
+_client = None
+_threads = None
+
+################################################################################
+
+def _init_worker(api_key, threads, client_kwargs):
+    global _client, _threads
+    _client = VenueApiClient(api_key, **client_kwargs)
+    _threads = threads
+
+def _fetch(batch):
+    """Runs in a worker: fetch a batch and encode the results."""
+    resp = _client.get_details_bulk(batch, max_workers = _threads)
+    venues = []
+    for venue in resp['objects']:
+        if hasattr(venue, 'to_dict'):
+            venue = venue.to_dict()
+        venues.append(venue)
+    failed = []
+    for error in resp['errors']:
+        failed.extend(error['ids'])
+    return batch, venues, failed
+
+def _read_ids(ids):
+    if isinstance(ids, basestring):
+        with open(ids) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+    else:
+        for id in ids:
+            yield str(id)
+
+def _batches(ids, done, batch_size):
+    batch = []
+    for id in ids:
+        if id in done:
+            continue
+        batch.append(id)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class _Writer(object):
+
+    def __init__(self, path, format, fields):
+        self.file = open(path, 'ab')
+        self.format = format
+        if format == 'csv':
+            self.fields = fields
+            self.csv = csv.writer(self.file)
+            if self.file.tell() == 0:
+                self.csv.writerow(fields)
+        elif format != 'ndjson':
+            raise ValueError('Unknown output format %r' % format)
+
+    def write(self, venue):
+        if self.format == 'ndjson':
+            self.file.write(json.dumps(venue, separators=(',', ':')) + '\n')
+        else:
+            row = []
+            for field in self.fields:
+                value = venue.get(field)
+                if isinstance(value, unicode):
+                    value = value.encode('utf-8')
+                elif isinstance(value, (list, dict)):
+                    value = json.dumps(value)
+                row.append(value)
+            self.csv.writerow(row)
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+################################################################################
+
+def hydrate(api_key, ids, output, checkpoint = None, processes = 4, threads = 8, batch_size = 100, \
+                format = 'ndjson', fields = None, report_every = 10, progress = None, client_kwargs = None):
+    """
+    Fetch details (menus and opening hours included) for many venues.
+
+    Ids are sent in batches to a pool of processes; each process uses
+    get_details_bulk with 'threads' concurrent requests. Results are
+    appended to output as they arrive, and the ids of every written
+    batch are appended to the checkpoint file, so running again with
+    the same checkpoint skips the ids that are already done.
+
+    Args:
+      api_key       : MenuPlatform API key
+      ids           : iterable of venue ids, or path of a file with one id per line
+      output        : path of the output file, appended to
+      checkpoint    : path of the file listing the finished ids
+      processes     : number of worker processes
+      threads       : concurrent requests per process
+      batch_size    : ids handed to a worker at a time
+      format        : 'ndjson' (one venue per line) or 'csv' of the given fields
+      fields        : venue fields written in csv format
+      report_every  : seconds between two progress reports
+      progress      : callable given the progress dictionary, defaults to
+                      printing a line on stderr
+      client_kwargs : extra VenueApiClient arguments. Ex {'retry': RetryPolicy()}
+
+    Returns:
+      A dictionary with 'done', 'failed', 'skipped', 'elapsed' and 'rate'
+      (venues per second); ids that failed are listed under 'failed_ids'
+      and are not checkpointed.
+    """
+    if format == 'csv' and not fields:
+        raise ValueError('Please provide the fields to write in csv format')
+    if progress is None:
+        progress = _print_progress
+
+    done = set()
+    if checkpoint and os.path.exists(checkpoint):
+        done.update(_read_ids(checkpoint))
+
+    writer = _Writer(output, format, fields)
+    done_file = open(checkpoint, 'a') if checkpoint else None
+    pool = multiprocessing.Pool(processes, _init_worker, (api_key, threads, client_kwargs or {}))
+    stats = {'done': 0, 'failed': 0, 'skipped': len(done), 'elapsed': 0.0, 'rate': 0.0}
+    failed_ids = []
+    start = last_report = time.time()
+    try:
+        for batch, venues, failed in pool.imap_unordered(_fetch, _batches(_read_ids(ids), done, batch_size)):
+            for venue in venues:
+                writer.write(venue)
+            failed = set(failed)
+            finished = [id for id in batch if id not in failed]
+            # the output is on disk before its ids are checkpointed
+            writer.flush()
+            if done_file is not None:
+                done_file.write(''.join(id + '\n' for id in finished))
+                done_file.flush()
+            stats['done'] += len(finished)
+            stats['failed'] += len(failed)
+            failed_ids.extend(failed)
+
+            now = time.time()
+            if now - last_report >= report_every:
+                stats['elapsed'] = now - start
+                stats['rate'] = stats['done'] / stats['elapsed']
+                progress(dict(stats))
+                last_report = now
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        writer.close()
+        if done_file is not None:
+            done_file.close()
+
+    stats['elapsed'] = time.time() - start
+    stats['rate'] = stats['done'] / stats['elapsed'] if stats['elapsed'] else 0.0
+    stats['failed_ids'] = failed_ids
+    return stats
+
+def _print_progress(stats):
+    sys.stderr.write('%(done)d done, %(failed)d failed, %(skipped)d skipped, '
+                     '%(rate).1f venues/s\n' % stats)
+
+################################################################################
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Fetch details for many Locu venues.')
+    parser.add_argument('--key', required = True, help = 'api key')
+    parser.add_argument('--ids', required = True, help = 'file with one venue id per line')
+    parser.add_argument('--output', required = True, help = 'output file')
+    parser.add_argument('--checkpoint', help = 'file listing finished ids')
+    parser.add_argument('--processes', type = int, default = multiprocessing.cpu_count())
+    parser.add_argument('--threads', type = int, default = 8)
+    parser.add_argument('--batch-size', type = int, default = 100)
+    parser.add_argument('--format', choices = ['ndjson', 'csv'], default = 'ndjson')
+    parser.add_argument('--fields', help = 'comma separated venue fields for csv output')
+    args = parser.parse_args()
+
+    stats = hydrate(args.key, args.ids, args.output, checkpoint = args.checkpoint, processes = args.processes, \
+                        threads = args.threads, batch_size = args.batch_size, format = args.format, \
+                        fields = args.fields.split(',') if args.fields else None)
+    _print_progress(stats)
+
+
+if __name__ == '__main__':
+    main()
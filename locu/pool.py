@@ -0,0 +1,99 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from httplib2 import Http
+
+__all__ = [
+    'ConnectionPool',
+]
+
+################################################################################
+
+class ConnectionPool(object):
+    """
+    Thread-safe pool of httplib2.Http connections.
+
+    An Http object is used by one thread at a time and keeps its
+    sockets alive between requests, so handing the same objects
+    out again avoids a new TCP setup for every call.
+    """
+
+    def __init__(self, size = 10, timeout = None, http_factory = Http):
+        """
+        Args:
+          size         : maximum number of connections
+            type : int
+          timeout      : seconds to wait for a free connection, None waits forever
+            type : float
+          http_factory : callable creating a new connection
+        """
+        if size < 1:
+            raise ValueError('size must be at least 1')
+        self.size = size
+        self.timeout = timeout
+        self.http_factory = http_factory
+        self._idle = []
+        self._created = 0
+        self._cond = threading.Condition(threading.Lock())
+        self.checkouts = 0
+        self.reused = 0
+        self.waits = 0
+
+    def acquire(self):
+        with self._cond:
+            self.checkouts += 1
+            deadline = None if self.timeout is None else time.time() + self.timeout
+            if not self._idle and self._created >= self.size:
+                self.waits += 1
+            while not self._idle and self._created >= self.size:
+                if deadline is None:
+                    self._cond.wait()
+                    continue
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise RuntimeError('Timed out waiting for a free connection')
+                # another thread may take the connection we were woken for
+                self._cond.wait(remaining)
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop()
+            self._created += 1
+        try:
+            return self.http_factory()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn, discard = False):
+        """Return conn to the pool. Broken connections should be discarded."""
+        with self._cond:
+            if discard:
+                self._created -= 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=True)
+            raise
+        self.release(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'created': self._created,
+                'idle': len(self._idle),
+                'in_use': self._created - len(self._idle),
+                'checkouts': self.checkouts,
+                'reused': self.reused,
+                'waits': self.waits,
+            }
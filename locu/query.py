@@ -0,0 +1,68 @@
+from copy import deepcopy
+
+__all__ = [
+    'PreparedQuery',
+]
+
+################################################################################
+
+class PreparedQuery(object):
+    """
+    Search, insight or details call built once and run many times.
+
+    Made by client.prepare and run by client.execute. Arguments are
+    checked and encoded when the query is prepared, so executing it
+    does no parameter work: the uri is reused as is, and the canonical
+    key (the uri without the api_key, parameters sorted) is the one
+    used for caching, coalescing and the 'key' of observer events.
+    Queries are immutable; replace derives a variant.
+    """
+    __slots__ = ('client', 'endpoint', '_items', 'uri', 'key')
+
+    def __init__(self, client, endpoint, kwargs, uri, key):
+        set = object.__setattr__
+        set(self, 'client', client)
+        set(self, 'endpoint', endpoint)
+        set(self, '_items', tuple(sorted(deepcopy(kwargs).iteritems())))
+        set(self, 'uri', uri)
+        set(self, 'key', key)
+
+    @property
+    def kwargs(self):
+        """Copy of the arguments the query was prepared with."""
+        return deepcopy(dict(self._items))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('PreparedQuery is immutable, use replace')
+
+    def __delattr__(self, name):
+        raise AttributeError('PreparedQuery is immutable')
+
+    def replace(self, **changes):
+        """
+        Query with some arguments changed, others kept.
+        Ex query.replace(location = (37.78, -122.41))
+        Passing None removes an argument.
+        """
+        kwargs = self.kwargs
+        kwargs.update(changes)
+        return self.client.prepare(self.endpoint, **kwargs)
+
+    def __eq__(self, other):
+        return isinstance(other, PreparedQuery) and self.key == other.key
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return '<PreparedQuery %s>' % self.key
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name in self.__slots__:
+            object.__setattr__(self, name, state[name])
@@ -0,0 +1,206 @@
+try:
+    import simplejson as json
+except :
+    import json
+
+__all__ = [
+    'Venue',
+    'Menu',
+    'MenuItem',
+    'to_records',
+]
+
+_strings = {}
+
+def _intern(value):
+    """Share one copy of frequently repeated strings (unicode included)."""
+    if isinstance(value, basestring):
+        return _strings.setdefault(value, value)
+    if isinstance(value, list):
+        return [_intern(v) for v in value]
+    return value
+
+def _to_dict(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_to_dict(v) for v in value]
+    if isinstance(value, dict):
+        return dict((k, _to_dict(v)) for k, v in value.iteritems())
+    return value
+
+################################################################################
+
+class Record(object):
+    """
+    Compact read-only view of an object returned by the API.
+
+    Known fields live in __slots__ instead of a per-object dict.
+    Values of INTERNED fields are shared between records, and LAZY
+    fields are kept as compact JSON text until first accessed.
+
+    Records support the read side of the dict interface (obj['name'],
+    obj.get('menus'), 'lat' in obj), so code written for plain
+    dictionaries keeps working. to_dict() gives a plain dictionary back.
+    """
+
+    __slots__ = ('_extra',)
+
+    FIELDS = ()
+    INTERNED = frozenset()
+    # field -> function turning the decoded JSON into the exposed value
+    LAZY = {}
+
+    def __init__(self, data):
+        extra = None
+        for key, value in data.iteritems():
+            if key in self.LAZY:
+                if value is not None:
+                    value = _Lazy(json.dumps(value, separators=(',', ':')))
+                setattr(self, '_' + key, value)
+            elif key in self.FIELDS:
+                if key in self.INTERNED:
+                    value = _intern(value)
+                setattr(self, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        self._extra = extra
+
+    def _lazy(self, key):
+        value = getattr(self, '_' + key, None)
+        if isinstance(value, _Lazy):
+            value = self.LAZY[key](json.loads(value.text))
+            setattr(self, '_' + key, value)
+        return value
+
+    def keys(self):
+        keys = [key for key in self.FIELDS if hasattr(self, key)]
+        keys += [key for key in self.LAZY if hasattr(self, '_' + key)]
+        if self._extra:
+            keys += self._extra.keys()
+        return keys
+
+    def __contains__(self, key):
+        if key in self.LAZY:
+            return hasattr(self, '_' + key)
+        if key in self.FIELDS:
+            return hasattr(self, key)
+        return bool(self._extra) and key in self._extra
+
+    def __getitem__(self, key):
+        if key in self.LAZY:
+            if not hasattr(self, '_' + key):
+                raise KeyError(key)
+            return self._lazy(key)
+        if key in self.FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default = None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        data = {}
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                data[key] = _to_dict(getattr(self, key))
+        for key in self.LAZY:
+            value = getattr(self, '_' + key, _missing)
+            if isinstance(value, _Lazy):
+                # never decoded, skip building records
+                data[key] = json.loads(value.text)
+            elif value is not _missing:
+                data[key] = _to_dict(value)
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    def __repr__(self):
+        return '<%s %s>' % (self.__class__.__name__, self.get('id', self.get('name')))
+
+
+class _Lazy(object):
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+_missing = object()
+
+################################################################################
+
+class MenuItem(Record):
+    """A menu item, from menu item search or inside a menu."""
+
+    FIELDS = ('id', 'type', 'name', 'description', 'price', 'option_groups', \
+                  'resource_uri', 'venue', 'text')
+    __slots__ = FIELDS
+    INTERNED = frozenset(['type'])
+
+    def __init__(self, data):
+        super(MenuItem, self).__init__(data)
+        venue = getattr(self, 'venue', None)
+        if isinstance(venue, dict):
+            self.venue = Venue(venue)
+
+
+def _sections(sections):
+    for section in sections:
+        for subsection in section.get('subsections', []):
+            subsection['contents'] = [MenuItem(item) for item in subsection.get('contents', [])]
+    return sections
+
+
+class Menu(Record):
+    """A venue menu. Its items become MenuItem records when sections is first read."""
+
+    FIELDS = ('menu_name',)
+    __slots__ = FIELDS + ('_sections',)
+    LAZY = {'sections': _sections}
+
+    @property
+    def sections(self):
+        return self._lazy('sections')
+
+
+class Venue(Record):
+    """A venue. menus and open_hours are decoded on first access."""
+
+    FIELDS = ('id', 'name', 'website_url', 'has_menu', 'street_address', 'locality', \
+                  'region', 'postal_code', 'country', 'lat', 'long', 'phone', \
+                  'resource_uri', 'categories', 'cuisines', 'facebook_url', 'twitter_id')
+    __slots__ = FIELDS + ('_menus', '_open_hours')
+    INTERNED = frozenset(['locality', 'region', 'postal_code', 'country', 'categories', 'cuisines'])
+    LAZY = {
+        'menus': lambda menus: [Menu(menu) for menu in menus],
+        'open_hours': lambda open_hours: open_hours,
+    }
+
+    @property
+    def menus(self):
+        return self._lazy('menus')
+
+    @property
+    def open_hours(self):
+        return self._lazy('open_hours')
+
+################################################################################
+
+def to_records(resp, record_class):
+    """
+    Replace the 'objects' of a search or details response
+    with records of record_class.
+    """
+    if 'objects' in resp:
+        resp['objects'] = [record_class(obj) for obj in resp['objects']]
+    return resp
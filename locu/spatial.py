@@ -0,0 +1,215 @@
+import math
+import threading
+
+__all__ = [
+    'SpatialIndex',
+]
+
+EARTH_RADIUS = 6371000.0 # meters
+METERS_PER_DEGREE = 111320.0
+
+# insight filters compared with the venue field of the same name
+EXACT_FILTERS = ('country', 'locality', 'region', 'postal_code')
+
+################################################################################
+
+def distance(lat1, long1, lat2, long2):
+    """Great circle distance in meters."""
+    lat1, long1, lat2, long2 = map(math.radians, (lat1, long1, lat2, long2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((long2 - long1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+################################################################################
+
+class SpatialIndex(object):
+    """
+    Grid index over venues that have already been fetched.
+
+    Answers the location/radius and tl_coord/br_coord filters of
+    VenueApiClient.search locally. Venues are bucketed into square
+    cells of cell_size degrees; a query only looks at the cells
+    overlapping its area.
+    """
+
+    def __init__(self, venues = None, cell_size = 0.01):
+        """
+        Args:
+          venues    : venue dictionaries to index
+          cell_size : side of a grid cell in degrees, 0.01 is about 1km
+            type : float
+        """
+        self.cell_size = cell_size
+        self._venues = {}
+        # coordinates as indexed, the venue dictionaries may change
+        self._coords = {}
+        self._cells = {}
+        self._lock = threading.Lock()
+        if venues:
+            self.add_many(venues)
+
+    def __len__(self):
+        return len(self._venues)
+
+    def __contains__(self, id):
+        return id in self._venues
+
+    def _cell(self, lat, long):
+        return (int(math.floor(lat / self.cell_size)), int(math.floor(long / self.cell_size)))
+
+    def add(self, venue):
+        """
+        Add or replace a venue dictionary as returned by search or
+        get_details. Venues without coordinates are ignored.
+        """
+        lat, long = venue.get('lat'), venue.get('long')
+        if lat is None or long is None:
+            return
+        with self._lock:
+            self._remove(venue['id'])
+            self._venues[venue['id']] = venue
+            self._coords[venue['id']] = (lat, long)
+            self._cells.setdefault(self._cell(lat, long), set()).add(venue['id'])
+
+    def add_many(self, venues):
+        for venue in venues:
+            self.add(venue)
+
+    def add_response(self, resp):
+        """Add the objects of a search or get_details response."""
+        self.add_many(resp.get('objects', []))
+
+    def remove(self, id):
+        with self._lock:
+            self._remove(id)
+
+    def _remove(self, id):
+        venue = self._venues.pop(id, None)
+        if venue is not None:
+            cell = self._cell(*self._coords.pop(id))
+            ids = self._cells[cell]
+            ids.discard(id)
+            if not ids:
+                del self._cells[cell]
+
+    def _candidates(self, min_lat, min_long, max_lat, max_long):
+        lat_lo, long_lo = self._cell(min_lat, min_long)
+        lat_hi, long_hi = self._cell(max_lat, max_long)
+        if (lat_hi - lat_lo + 1) * (long_hi - long_lo + 1) > len(self._cells):
+            # area larger than the populated part of the grid
+            ids = self._coords
+        else:
+            ids = []
+            for i in xrange(lat_lo, lat_hi + 1):
+                for j in xrange(long_lo, long_hi + 1):
+                    ids.extend(self._cells.get((i, j), ()))
+        candidates = []
+        for id in ids:
+            lat, long = self._coords[id]
+            if min_lat <= lat <= max_lat and min_long <= long <= max_long:
+                candidates.append(id)
+        return candidates
+
+    def search(self, category = None, cuisine = None, location = (None, None), radius = None, \
+                   tl_coord = (None, None), br_coord = (None, None), has_menu = None, limit = None):
+        """
+        Local counterpart of VenueApiClient.search.
+
+        Args:
+          category : List of category types, a venue matches if it has any of them
+            type : [string]
+          cuisine  : List of cuisine types, a venue matches if it has any of them
+            type : [string]
+          location : Tuple that consists of (latitude, longtitude) coordinates.
+                     Results are sorted by distance from it
+            type : tuple(float, float)
+          radius   : Radius in meters around location
+            type : float
+          tl_coord : Tuple that consists of (latitude, longtitude) for bounding box top left coordinates
+            type : tuple(float, float)
+          br_coord : Tuple that consists of (latitude, longtitude) for bounding box bottom right coordinates
+            type : tuple(float, float)
+          has_menu : Filter venues that have menus in them
+            type : boolean
+          limit    : maximum number of venues returned
+            type : int
+
+        Returns:
+          A dictionary shaped like a search response
+        """
+        lat, long = location
+        tl_lat, tl_long = tl_coord
+        br_lat, br_long = br_coord
+        with self._lock:
+            if tl_lat is not None and br_lat is not None:
+                ids = self._candidates(min(tl_lat, br_lat), min(tl_long, br_long),
+                                       max(tl_lat, br_lat), max(tl_long, br_long))
+            elif lat is not None and radius:
+                dlat = radius / METERS_PER_DEGREE
+                dlong = radius / (METERS_PER_DEGREE * max(0.01, math.cos(math.radians(lat))))
+                ids = self._candidates(lat - dlat, long - dlong, lat + dlat, long + dlong)
+            else:
+                ids = list(self._venues)
+            venues = [self._venues[id] for id in ids]
+            coords = dict((id, self._coords[id]) for id in ids) if lat is not None else None
+
+        if category:
+            category = set(category)
+            venues = [v for v in venues if category.intersection(v.get('categories') or ())]
+        if cuisine:
+            cuisine = set(cuisine)
+            venues = [v for v in venues if cuisine.intersection(v.get('cuisines') or ())]
+        if has_menu is not None:
+            venues = [v for v in venues if bool(v.get('has_menu')) == bool(has_menu)]
+        if lat is not None:
+            with_distance = [(distance(lat, long, *coords[v['id']]), v) for v in venues]
+            if radius:
+                with_distance = [(d, v) for d, v in with_distance if d <= radius]
+            with_distance.sort(key=lambda item: item[0])
+            venues = [v for d, v in with_distance]
+        if limit:
+            venues = venues[:limit]
+        return {'meta': {'next': None, 'limit': limit}, 'objects': venues}
+
+    def insight(self, dimension, name = None, country = None, locality = None, region = None, \
+                    postal_code = None, **search_kwargs):
+        """
+        Local counterpart of VenueApiClient.insight, counting the
+        indexed venues matching the filters.
+
+        Args:
+          dimension     : 'locality', 'category', 'cuisine' or 'region'
+          name          : part of the venue name, case insensitive
+          search_kwargs : filters of search. Ex category = ['restaurant']
+
+        Returns:
+          A dictionary shaped like an insight response
+
+        Raises:
+          ValueError for filters that can not be applied locally
+        """
+        if dimension not in ('locality', 'category', 'cuisine', 'region'):
+            raise ValueError('Unknown dimension %r' % dimension)
+        unsupported = [key for key, value in search_kwargs.iteritems() if value not in (None, (None, None)) \
+                           and key not in ('category', 'cuisine', 'location', 'radius', 'tl_coord', 'br_coord', 'has_menu')]
+        if unsupported:
+            raise ValueError('Can not filter on %s locally' % ', '.join(sorted(unsupported)))
+
+        venues = self.search(**search_kwargs)['objects']
+        exact = [(field, value) for field, value in zip(EXACT_FILTERS, (country, locality, region, postal_code)) \
+                     if value is not None]
+        name = name.lower() if name else None
+        counts = {}
+        for venue in venues:
+            if exact and any(venue.get(field) != value for field, value in exact):
+                continue
+            if name and name not in (venue.get('name') or '').lower():
+                continue
+            if dimension in ('category', 'cuisine'):
+                values = venue.get(dimension == 'category' and 'categories' or 'cuisines') or ()
+            else:
+                values = (venue.get(dimension),)
+            for value in values:
+                if value is not None:
+                    counts[value] = counts.get(value, 0) + 1
+        return {'meta': {'dimension': dimension}, 'objects': counts}
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict
+
+__all__ = [
+    'EntityStore',
+]
+
+_missing = object()
+
+################################################################################
+
+class EntityStore(object):
+    """
+    Identity map of the venues and menu items seen in responses.
+
+    Every object a client receives is merged by id into one dictionary
+    per entity, and the time each of its fields was last received is
+    kept. Responses are given the stored dictionaries, so a venue
+    received again unchanged is the same object, and after search and
+    get_details the store holds the fields of both. Clients sharing a
+    store answer get_menus and is_open from it when the fields they
+    need are fresh.
+
+    Venues and menu items are kept apart, under (kind, id) keys where
+    kind is 'venue' or 'menu_item', so clients of both APIs can share a
+    store without their ids colliding.
+
+    Stored entities are shared and must be treated as read-only. They
+    are never modified once handed out: merging changed fields stores
+    an updated copy, so other holders keep a consistent snapshot.
+    """
+
+    def __init__(self, max_size = 100000, ttl = 3600):
+        """
+        Args:
+          max_size : maximum number of entities kept, the ones least
+                     recently received are dropped first
+            type : int
+          ttl      : number of seconds a field is considered fresh
+            type : float
+        """
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entities = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.merges = 0
+
+    def __len__(self):
+        return len(self._entities)
+
+    def __contains__(self, key):
+        """key is a (kind, id) pair. Ex ('venue', id)"""
+        return key in self._entities
+
+    def merge(self, obj, kind = 'venue', now = None):
+        """
+        Merge the fields of a venue or menu item dictionary into the
+        stored entity of the same kind and id, and return the stored
+        entity: the previous one if no field changed, an updated copy
+        otherwise. Objects without an id are returned unchanged.
+        """
+        id = obj.get('id')
+        if id is None:
+            return obj
+        key = (kind, id)
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entities.pop(key, None)
+            if entry is None:
+                entity, fetched = obj, {}
+            else:
+                entity, fetched = entry
+                if entity is not obj and any(entity.get(field, _missing) != value \
+                                                 for field, value in obj.iteritems()):
+                    entity = dict(entity)
+                    entity.update(obj)
+            for field in obj:
+                fetched[field] = now
+            self._entities[key] = (entity, fetched)
+            self.merges += 1
+            while len(self._entities) > self.max_size:
+                self._entities.popitem(last=False)
+        return entity
+
+    def merge_response(self, resp, kind = 'venue', now = None):
+        """
+        Merge the objects of a search or details response of the given
+        kind in place. The venues embedded in menu items are merged as
+        venues.
+        """
+        objects = resp.get('objects') if isinstance(resp, dict) else None
+        if not isinstance(objects, list):
+            return resp
+        now = time.time() if now is None else now
+        for i, obj in enumerate(objects):
+            if not isinstance(obj, dict):
+                continue
+            venue = obj.get('venue')
+            if isinstance(venue, dict) and venue.get('id') is not None:
+                obj['venue'] = self.merge(venue, 'venue', now)
+            objects[i] = self.merge(obj, kind, now)
+        return resp
+
+    def get(self, id, fields = (), max_age = None, kind = 'venue'):
+        """
+        Return the stored entity of kind if it has all the given fields
+        and they were received less than max_age (defaults to ttl)
+        seconds ago, None otherwise.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            entry = self._entities.get((kind, id))
+            if entry is not None:
+                entity, fetched = entry
+                oldest = time.time() - max_age
+                if all(fetched.get(field, oldest) > oldest for field in fields):
+                    self.hits += 1
+                    return entity
+            self.misses += 1
+            return None
+
+    def remove(self, id, kind = 'venue'):
+        with self._lock:
+            self._entities.pop((kind, id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entities.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'merges': self.merges,
+            'size': len(self._entities),
+        }
@@ -0,0 +1,149 @@
+try:
+    import simplejson as json
+except :
+    import json
+
+__all__ = [
+    'ObjectStream',
+]
+
+WHITESPACE = ' \t\n\r'
+# characters that may follow a complete number
+DELIMITERS = WHITESPACE + ',:]}'
+
+################################################################################
+
+class ObjectStream(object):
+    """
+    Incrementally decodes a response of the form
+    {"meta": {...}, "objects": [...]}.
+
+    Iterating yields each element of 'objects' as soon as it has been
+    read, so only one object (plus what was read ahead of it) is held
+    in memory at a time. The other top-level fields are decoded as a
+    whole and exposed through 'fields'; 'meta' is available as soon as
+    it was read, which for Locu responses is before the first object.
+    """
+
+    def __init__(self, read, close = None, chunk_size = 65536):
+        """
+        Args:
+          read       : callable returning the next chunk of the body ('' at the end)
+          close      : callable releasing the underlying connection
+          chunk_size : number of bytes asked from read at a time
+        """
+        self._read = read
+        self._close = close
+        self.chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._started = False
+        self.fields = {}
+
+    @property
+    def meta(self):
+        return self.fields.get('meta', {})
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _fill(self, size = 0):
+        """
+        Read another chunk, and more until at least size bytes were read.
+        Returns False at the end of the body.
+        """
+        if self._eof:
+            return False
+        chunks = []
+        read = 0
+        while True:
+            chunk = self._read(self.chunk_size)
+            if not chunk:
+                self._eof = True
+                break
+            chunks.append(chunk)
+            read += len(chunk)
+            if read >= size:
+                break
+        if not chunks:
+            return False
+        # drop what has been consumed already
+        self._buf = self._buf[self._pos:] + ''.join(chunks)
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """Next non-whitespace character, or '' at the end."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars):
+        c = self._peek()
+        if c == '' or c not in chars:
+            raise ValueError('Expected %r at position %d, got %r' % (chars, self._pos, c))
+        self._pos += 1
+        return c
+
+    def _value(self):
+        """Decode the complete JSON value starting at the current position."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except ValueError:
+                # the value is not complete yet. Decoding starts over from
+                # its beginning, so read as much again as is buffered: a
+                # large object is then decoded a logarithmic number of times
+                if not self._fill(len(self._buf) - self._pos):
+                    raise
+                continue
+            if not self._eof and self._buf[self._pos] not in '{["' and \
+                    (end == len(self._buf) or self._buf[end] not in DELIMITERS):
+                # a number may continue in the next chunk: '12.' of 12.5, '1e' of 1e5
+                if self._fill():
+                    continue
+            self._pos = end
+            return value
+
+    def __iter__(self):
+        if self._started:
+            raise RuntimeError('An ObjectStream can only be iterated once')
+        self._started = True
+        try:
+            self._expect('{')
+            if self._peek() == '}':
+                return
+            while True:
+                key = self._value()
+                self._expect(':')
+                if key == 'objects' and self._peek() == '[':
+                    self._pos += 1
+                    if self._peek() == ']':
+                        self._pos += 1
+                    else:
+                        while True:
+                            yield self._value()
+                            if self._expect(',]') == ']':
+                                break
+                else:
+                    self.fields[key] = self._value()
+                if self._expect(',}') == '}':
+                    break
+        finally:
+            self.close()
@@ -0,0 +1,151 @@
+import hashlib
+import sqlite3
+import time
+import zlib
+
+try:
+    import simplejson as json
+except :
+    import json
+
+__all__ = [
+    'VenueSync',
+]
+
+################################################################################
+
+class VenueSync(object):
+    """
+    Keeps a local mirror of venue details up to date.
+
+    For every tracked venue an sqlite file stores the payload, a
+    content hash, when it was last seen and how often it changed.
+    Each run refreshes only the venues that are due; venues that
+    changed often before are due again sooner than stable ones.
+    Unchanged payloads are not rewritten.
+    """
+
+    def __init__(self, client, path, min_interval = 3600, max_interval = 7 * 86400, \
+                     batch_size = 500, max_workers = 4):
+        """
+        Args:
+          client       : VenueApiClient used to fetch details
+          path         : sqlite file holding the mirror, created if missing
+          min_interval : shortest time between two checks of a venue, in seconds
+          max_interval : longest time between two checks of a venue, in seconds
+          batch_size   : number of venues fetched with one get_details_bulk call
+          max_workers  : concurrent detail requests
+        """
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.db = sqlite3.connect(path, timeout=30)
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS venues ('
+                            'id TEXT PRIMARY KEY, hash TEXT, payload BLOB, '
+                            'last_seen REAL, last_checked REAL, next_due REAL, '
+                            'checks INTEGER DEFAULT 0, changes INTEGER DEFAULT 0, '
+                            'removed INTEGER DEFAULT 0)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS venues_next_due ON venues (next_due)')
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM venues WHERE removed = 0').fetchone()[0]
+
+    def track(self, ids):
+        """Start mirroring ids; new ids are due right away."""
+        with self.db:
+            self.db.executemany('INSERT OR IGNORE INTO venues (id, next_due) VALUES (?, 0)',
+                                ((str(id),) for id in ids))
+
+    def get(self, id):
+        """Mirrored details of a venue, or None."""
+        row = self.db.execute('SELECT payload FROM venues WHERE id = ? AND removed = 0',
+                              (id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def due(self, now = None, limit = None):
+        """Ids whose next check is due."""
+        now = time.time() if now is None else now
+        query = 'SELECT id FROM venues WHERE next_due <= ? ORDER BY next_due'
+        params = (now,)
+        if limit:
+            query += ' LIMIT ?'
+            params = (now, limit)
+        return [row[0] for row in self.db.execute(query, params)]
+
+    def _interval(self, checks, changes):
+        # estimated chance that a check finds a change
+        rate = (changes + 1.0) / (checks + 2.0)
+        return max(self.min_interval, min(self.max_interval, self.min_interval / rate))
+
+    def run(self, limit = None):
+        """
+        Refresh the venues that are due.
+
+        Args:
+          limit : maximum number of venues refreshed in this run
+
+        Returns:
+          A generator of change events, dictionaries with
+            'type'  : 'added', 'changed' or 'removed'
+            'id'    : venue id
+            'venue' : new details, None for removed venues
+        Venues whose request failed stay due for the next run.
+        """
+        ids = self.due(limit=limit)
+        for start in xrange(0, len(ids), self.batch_size):
+            batch = ids[start:start + self.batch_size]
+            resp = self.client.get_details_bulk(batch, max_workers = self.max_workers)
+            failed = set()
+            for error in resp['errors']:
+                failed.update(error['ids'])
+            found = {}
+            for venue in resp['objects']:
+                if hasattr(venue, 'to_dict'):
+                    venue = venue.to_dict()
+                found[venue['id']] = venue
+
+            events = []
+            now = time.time()
+            with self.db:
+                for id in batch:
+                    if id in failed:
+                        continue
+                    events.extend(self._update(id, found.get(id), now))
+            for event in events:
+                yield event
+
+    def _update(self, id, venue, now):
+        hash, checks, changes, removed = self.db.execute(
+            'SELECT hash, checks, changes, removed FROM venues WHERE id = ?', (id,)).fetchone()
+        checks += 1
+        if venue is None:
+            if removed or hash is None:
+                self.db.execute('UPDATE venues SET last_checked = ?, checks = ?, next_due = ?, removed = 1 '
+                                'WHERE id = ?', (now, checks, now + self.max_interval, id))
+                return []
+            changes += 1
+            self.db.execute('UPDATE venues SET last_checked = ?, checks = ?, changes = ?, next_due = ?, '
+                            'removed = 1 WHERE id = ?',
+                            (now, checks, changes, now + self._interval(checks, changes), id))
+            return [{'type': 'removed', 'id': id, 'venue': None}]
+
+        payload = json.dumps(venue, sort_keys=True, separators=(',', ':'))
+        new_hash = hashlib.sha1(payload).hexdigest()
+        if new_hash == hash and not removed:
+            self.db.execute('UPDATE venues SET last_seen = ?, last_checked = ?, checks = ?, next_due = ? '
+                            'WHERE id = ?', (now, now, checks, now + self._interval(checks, changes), id))
+            return []
+
+        kind = 'added' if hash is None or removed else 'changed'
+        if kind == 'changed':
+            changes += 1
+        self.db.execute('UPDATE venues SET hash = ?, payload = ?, last_seen = ?, last_checked = ?, '
+                        'checks = ?, changes = ?, next_due = ?, removed = 0 WHERE id = ?',
+                        (new_hash, sqlite3.Binary(zlib.compress(payload)), now, now, checks, changes,
+                         now + self._interval(checks, changes), id))
+        return [{'type': kind, 'id': id, 'venue': venue}]
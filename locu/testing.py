@@ -0,0 +1,351 @@
+import gzip
+import hashlib
+import math
+import random
+import socket
+import threading
+import time
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from StringIO import StringIO
+from urllib import urlencode
+from urlparse import parse_qsl
+
+try:
+    import simplejson as json
+except :
+    import json
+
+__all__ = [
+    'MockLocuServer',
+    'make_venues',
+]
+
+CATEGORIES = ['restaurant', 'spa', 'beauty salon', 'gym', 'laundry', 'hair care', 'other']
+CUISINES = ['american', 'italian', 'mexican', 'chinese', 'japanese', 'thai', 'indian', 'french']
+LOCALITIES = [
+    ('San Francisco', 'CA', '94103', 37.7749, -122.4194),
+    ('Oakland', 'CA', '94612', 37.8044, -122.2711),
+    ('New York', 'NY', '10001', 40.7128, -74.0060),
+]
+ITEMS = ['Pizza', 'Burger', 'Salad', 'Espresso', 'Pasta', 'Taco', 'Soup', 'Sandwich', 'Pad Thai', 'Curry']
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+PAGE_SIZE = 25
+
+################################################################################
+
+def make_venues(count = 200, seed = 0):
+    """
+    Synthetic venues shaped like Locu venue details, with menus and
+    opening hours. The same seed always gives the same venues.
+    """
+    rng = random.Random(seed)
+    venues = []
+    for i in xrange(count):
+        locality, region, postal_code, lat, long = rng.choice(LOCALITIES)
+        category = rng.choice(CATEGORIES)
+        has_menu = category == 'restaurant' and rng.random() < 0.9
+        venue = {
+            'id': '%020x' % rng.getrandbits(80),
+            'name': '%s %s %d' % (rng.choice(ITEMS), category.title(), i),
+            'categories': [category],
+            'cuisines': rng.sample(CUISINES, 2) if category == 'restaurant' else [],
+            'locality': locality,
+            'region': region,
+            'postal_code': postal_code,
+            'country': 'United States',
+            'street_address': '%d Market St' % rng.randint(1, 3000),
+            'lat': round(lat + rng.uniform(-0.05, 0.05), 6),
+            'long': round(long + rng.uniform(-0.05, 0.05), 6),
+            'website_url': 'http://venue%d.example.com' % i,
+            'has_menu': has_menu,
+            'open_hours': {},
+            'menus': [],
+        }
+        opens = rng.choice([7, 9, 11, 17])
+        closes = (opens + rng.choice([6, 8, 10])) % 24
+        for day in DAYS:
+            if rng.random() < 0.85:
+                venue['open_hours'][day] = ['%02d:00:00 - %02d:00:00' % (opens, closes)]
+            else:
+                venue['open_hours'][day] = []
+        if has_menu:
+            contents = []
+            for name in rng.sample(ITEMS, rng.randint(3, 8)):
+                contents.append({
+                    'type': 'ITEM',
+                    'id': '%020x' % rng.getrandbits(80),
+                    'name': name,
+                    'description': 'House %s' % name.lower(),
+                    'price': '%.2f' % rng.uniform(2, 30),
+                })
+            venue['menus'].append({'menu_name': 'Main', 'sections': [
+                {'section_name': 'Mains', 'subsections': [{'subsection_name': '', 'contents': contents}]}]})
+        venues.append(venue)
+    return venues
+
+def _summary(venue):
+    """Venue as returned in search results, without menus and hours."""
+    return dict((k, v) for k, v in venue.iteritems() if k not in ('menus', 'open_hours'))
+
+def _distance(lat1, long1, lat2, long2):
+    lat1, long1, lat2, long2 = map(math.radians, (lat1, long1, lat2, long2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((long2 - long1) / 2) ** 2
+    return 2 * 6371000.0 * math.asin(min(1.0, math.sqrt(a)))
+
+################################################################################
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # write each response in one piece, small writes stall on delayed ACKs
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server.mock
+        server._count('requests')
+        if server.latency:
+            if isinstance(server.latency, tuple):
+                time.sleep(server.rng.uniform(*server.latency))
+            else:
+                time.sleep(server.latency)
+
+        path, _, query = self.path.partition('?')
+        params = dict(parse_qsl(query, keep_blank_values=True))
+        if not params.get('api_key'):
+            return self._send(401, {'error_message': 'Please provide an api key'})
+        if server.error_rate and server.rng.random() < server.error_rate:
+            server._count('errors')
+            return self._send(500, {'error_message': 'Internal server error'})
+
+        parts = [part for part in path.split('/') if part]
+        if len(parts) != 3 or parts[0] != 'v1_0' or parts[1] not in ('venue', 'menu_item'):
+            return self._send(404, {'error_message': 'Not found'})
+        kind, action = parts[1], parts[2]
+        if action == 'search':
+            return self._send(200, server.search(kind, path, params))
+        if action == 'insight':
+            if not params.get('dimension'):
+                return self._send(400, {'error_message': 'Please provide a dimension'})
+            return self._send(200, server.insight(kind, params))
+        return self._send(200, server.details(kind, action.split(';')[:5]))
+
+    def _send(self, status, data):
+        server = self.server.mock
+        body = json.dumps(data, sort_keys=True)
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            server._count('not_modified')
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if status == 200:
+            self.send_header('ETag', etag)
+        if 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            buf = StringIO()
+            with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+                f.write(body)
+            body = buf.getvalue()
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        server._count('bytes_sent', len(body))
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, *args):
+        HTTPServer.__init__(self, *args)
+        # open keep-alive connections, closed on stop
+        self.connections = set()
+
+    def process_request(self, request, client_address):
+        self.connections.add(request)
+        ThreadingMixIn.process_request(self, request, client_address)
+
+    def shutdown_request(self, request):
+        self.connections.discard(request)
+        HTTPServer.shutdown_request(self, request)
+
+    def handle_error(self, request, client_address):
+        # clients dropping keep-alive connections is not an error here
+        pass
+
+################################################################################
+
+class MockLocuServer(object):
+    """
+    Local stand-in for the Locu API serving synthetic fixtures.
+
+    Serves venue and menu item search (paginated through meta.next),
+    insight and details on a background thread, with configurable
+    latency and error rate. Responses carry an ETag, are gzipped when
+    the client accepts it and conditional requests get 304s. Point a client at it with api_url:
+
+        server = MockLocuServer(latency = 0.01).start()
+        client = VenueApiClient('any key', api_url = server.api_url)
+    """
+
+    def __init__(self, venues = None, latency = 0, error_rate = 0, port = 0, seed = 0):
+        """
+        Args:
+          venues     : venue details to serve, defaults to make_venues()
+          latency    : seconds added to every response, or a (min, max) range
+          error_rate : fraction of requests answered with a 500 error
+          port       : port to listen on, 0 picks a free one
+          seed       : seed of the latency and error randomness
+        """
+        self.venues = venues if venues is not None else make_venues(seed = seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._by_id = dict((venue['id'], venue) for venue in self.venues)
+        self._items = {}
+        for venue in self.venues:
+            for item in self._venue_items(venue):
+                self._items[item['id']] = item
+        self._server = _Server(('127.0.0.1', port), _Handler)
+        self._server.mock = self
+        self._thread = None
+
+    @property
+    def api_url(self):
+        return 'http://127.0.0.1:%d%%s' % self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        for request in list(self._server.connections):
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+        # let the handler threads see the closed connections and exit
+        deadline = time.time() + 1
+        while self._server.connections and time.time() < deadline:
+            time.sleep(0.01)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _count(self, name, n = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def _venue_items(self, venue):
+        for menu in venue['menus']:
+            for section in menu['sections']:
+                for subsection in section['subsections']:
+                    for item in subsection['contents']:
+                        data = dict(item)
+                        del data['type']
+                        data['venue'] = _summary(venue)
+                        yield data
+
+    def _venue_matches(self, venue, params):
+        for key in ('locality', 'region', 'country', 'postal_code', 'street_address', 'website_url'):
+            if key in params and venue[key].lower() != params[key].lower():
+                return False
+        if 'category' in params and not set(params['category'].split(',')) & set(venue['categories']):
+            return False
+        if 'cuisine' in params and not set(params['cuisine'].split(',')) & set(venue['cuisines']):
+            return False
+        if 'has_menu' in params and str(venue['has_menu']) != params['has_menu']:
+            return False
+        if 'location' in params and 'radius' in params:
+            lat, long = map(float, params['location'].split(','))
+            if _distance(lat, long, venue['lat'], venue['long']) > float(params['radius']):
+                return False
+        if 'bounds' in params:
+            tl, br = params['bounds'].split('|')
+            tl_lat, tl_long = map(float, tl.split(','))
+            br_lat, br_long = map(float, br.split(','))
+            if not (min(tl_lat, br_lat) <= venue['lat'] <= max(tl_lat, br_lat) and \
+                        min(tl_long, br_long) <= venue['long'] <= max(tl_long, br_long)):
+                return False
+        return True
+
+    def _item_matches(self, item, params):
+        if not self._venue_matches(item['venue'], dict((k, v) for k, v in params.iteritems() if k != 'name')):
+            return False
+        if 'description' in params and params['description'].lower() not in item['description'].lower():
+            return False
+        price = float(item['price'])
+        for key, test in (('price', lambda p, v: p == v), ('price__gt', lambda p, v: p > v), \
+                              ('price__gte', lambda p, v: p >= v), ('price__lt', lambda p, v: p < v), \
+                              ('price__lte', lambda p, v: p <= v)):
+            if key in params and not test(price, float(params[key])):
+                return False
+        return True
+
+    def _matches(self, kind, params):
+        if kind == 'venue':
+            objects = [_summary(v) for v in self.venues if self._venue_matches(v, params)]
+        else:
+            objects = [i for i in self._items.itervalues() if self._item_matches(i, params)]
+            objects.sort(key=lambda item: item['id'])
+        if 'name' in params:
+            objects = [o for o in objects if params['name'].lower() in o['name'].lower()]
+        return objects
+
+    def search(self, kind, path, params):
+        offset = int(params.pop('offset', 0))
+        # the next page link keeps every parameter, api_key included
+        objects = self._matches(kind, params)
+        next = None
+        if offset + PAGE_SIZE < len(objects):
+            params['offset'] = offset + PAGE_SIZE
+            next = '%s?%s' % (path, urlencode(sorted(params.items())))
+        return {
+            'meta': {'limit': PAGE_SIZE, 'cache-expiry': 3600, 'next': next},
+            'objects': objects[offset:offset + PAGE_SIZE],
+        }
+
+    def insight(self, kind, params):
+        params.pop('api_key', None)
+        dimension = params.pop('dimension')
+        counts = {}
+        for obj in self._matches(kind, params):
+            venue = obj.get('venue', obj)
+            if dimension == 'price':
+                values = [str(int(float(obj['price'])))]
+            elif dimension == 'category':
+                values = venue['categories']
+            elif dimension == 'cuisine':
+                values = venue['cuisines']
+            else:
+                values = [venue.get(dimension)]
+            for value in values:
+                counts[value] = counts.get(value, 0) + 1
+        return {'meta': {'dimension': dimension}, 'objects': counts}
+
+    def details(self, kind, ids):
+        source = self._by_id if kind == 'venue' else self._items
+        return {'meta': {'cache-expiry': 3600}, 'objects': [source[id] for id in ids if id in source]}
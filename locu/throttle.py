@@ -0,0 +1,140 @@
+import httplib
+import random
+import socket
+import threading
+import time
+
+from httplib2 import HttpLib2Error
+
+__all__ = [
+    'RateLimiter',
+    'RetryPolicy',
+    'shared_rate_limiter',
+]
+
+################################################################################
+
+class RateLimiter(object):
+    """
+    Adaptive token bucket.
+
+    Allows up to rate requests per second with bursts of up to burst
+    requests. Every failure halves the current rate (down to min_rate)
+    and every success raises it by a step back towards rate.
+    """
+
+    def __init__(self, rate, burst = None, min_rate = None, adaptive = True):
+        """
+        Args:
+          rate     : maximum requests per second
+            type : float
+          burst    : maximum number of requests let through at once, defaults to rate
+            type : int
+          min_rate : lowest rate an adaptive limiter slows down to, defaults to rate / 20
+            type : float
+          adaptive : slow down on failures and speed back up on successes
+            type : boolean
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.max_rate = float(rate)
+        self.rate = self.max_rate
+        self.burst = burst or max(1.0, self.max_rate)
+        self.min_rate = min_rate or self.max_rate / 20
+        self.adaptive = adaptive
+        self._step = (self.max_rate - self.min_rate) / 20
+        self._tokens = float(self.burst)
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.time()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def success(self):
+        if self.adaptive:
+            with self._lock:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + self._step)
+
+    def failure(self):
+        if self.adaptive:
+            with self._lock:
+                self._refill()
+                self.rate = max(self.min_rate, self.rate / 2)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def shared_rate_limiter(api_key, rate, **kwargs):
+    """
+    Return the RateLimiter of api_key, creating it with the given
+    arguments on first use, so all clients of one key share a budget.
+
+    Raises:
+      ValueError if api_key already has a limiter with another rate
+    """
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(api_key)
+        if limiter is None:
+            limiter = _rate_limiters[api_key] = RateLimiter(rate, **kwargs)
+        elif limiter.max_rate != float(rate):
+            raise ValueError('The rate limiter of this api key allows %s requests per second, not %s; '
+                             'pass a RateLimiter for a limit of this client\'s own' % (limiter.max_rate, rate))
+        return limiter
+
+################################################################################
+
+class RetryPolicy(object):
+    """
+    When and how long to wait before sending a failed request again.
+
+    Delays grow exponentially with full jitter: a random time between
+    0 and min(max_backoff, backoff * 2 ** attempt) seconds.
+    """
+
+    transport_errors = (socket.error, httplib.HTTPException, HttpLib2Error)
+
+    def __init__(self, max_retries = 3, backoff = 0.5, max_backoff = 30,
+                 statuses = (429, 500, 502, 503, 504)):
+        """
+        Args:
+          max_retries : number of times a request is sent again
+            type : int
+          backoff     : base delay in seconds
+            type : float
+          max_backoff : upper bound of a single delay in seconds
+            type : float
+          statuses    : HTTP statuses worth retrying
+            type : tuple(int)
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+
+    def is_retryable_status(self, status):
+        return int(status) in self.statuses
+
+    def delay(self, attempt, retry_after = None):
+        """Seconds to wait before retry number attempt (counting from 0)."""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if retry_after:
+            try:
+                delay = max(delay, min(self.max_backoff, float(retry_after)))
+            except ValueError:
+                pass
+        return delay
@@ -0,0 +1,50 @@
+import unittest
+
+from locu.analytics import MenuTable, np
+
+
+def venue(id, locality, cuisines, items):
+    contents = [{'type': 'ITEM', 'name': name, 'price': price} for name, price in items]
+    contents.append({'type': 'SECTION_TEXT', 'text': 'Cash only'})
+    return {'id': id, 'locality': locality, 'cuisines': cuisines, 'menus': [
+        {'menu_name': 'Main', 'sections': [{'section_name': 'Mains', 'subsections': [
+            {'subsection_name': '', 'contents': contents}]}]}]}
+
+
+VENUES = [
+    venue('a', 'San Francisco', ['italian', 'pizza'], [('Margherita', '10.00'), ('Calzone', '$14.50')]),
+    venue('b', 'Oakland', ['italian'], [('Espresso', '3'), ('Cookie', '')]),
+]
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class MenuTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = MenuTable.from_venues(VENUES)
+
+    def test_columns(self):
+        self.assertEqual(len(self.table), 4)
+        self.assertEqual(list(self.table.column('venue')), ['a', 'a', 'b', 'b'])
+        self.assertTrue(np.isnan(self.table.price[3]))
+
+    def test_filter(self):
+        self.assertEqual(list(self.table.filter(price__gt = 3).column('name')), ['Margherita', 'Calzone'])
+        self.assertEqual(list(self.table.filter(price__lte = 10, locality = ['Oakland']).column('name')), ['Espresso'])
+        self.assertEqual(list(self.table.filter(name = 'cal').column('name')), ['Calzone'])
+
+    def test_histogram(self):
+        counts, edges = self.table.histogram(bins = 2, range = (0, 20))
+        self.assertEqual(list(counts), [1, 2])
+
+    def test_aggregate(self):
+        by_locality = self.table.aggregate('locality')
+        self.assertEqual(by_locality['San Francisco'], {'count': 2, 'mean': 12.25, 'min': 10.0, 'max': 14.5})
+        self.assertEqual(by_locality['Oakland']['count'], 1)
+        by_cuisine = self.table.aggregate('cuisine')
+        self.assertEqual(by_cuisine['italian']['count'], 3)
+        self.assertEqual(by_cuisine['pizza'], {'count': 2, 'mean': 12.25, 'min': 10.0, 'max': 14.5})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from locu import VenueApiClient, MenuItemApiClient, AsyncVenueApiClient, AsyncMenuItemApiClient
+from locu.api import HttpException
+from locu.testing import MockLocuServer, make_venues
+from locu.workers import Executor
+
+
+class AsyncVenueApiClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MockLocuServer(venues = make_venues(120)).start()
+        self.blocking = VenueApiClient('key', api_url = self.server.api_url)
+        self.client = AsyncVenueApiClient('key', max_concurrency = 4, api_url = self.server.api_url)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_search(self):
+        future = self.client.search(locality = 'Oakland', category = ['restaurant'])
+        page = future.result(5)
+        self.assertEqual(page, self.blocking.search(locality = 'Oakland', category = ['restaurant']))
+        self.assertTrue(page['objects'])
+        next_page = self.client.search_next(page).result(5)
+        self.assertEqual(next_page, self.blocking.search_next(page))
+        self.assertEqual(self.client.search_next({'meta': {'next': None}}).result(0), {})
+
+    def test_details(self):
+        ids = [venue['id'] for venue in self.blocking.search(locality = 'Oakland')['objects'][:3]]
+        futures = [self.client.get_details(ids), self.client.get_menus(ids[0]),
+                   self.client.is_open(ids[0], '12:00:00', 'Monday')]
+        details, menus, is_open = [future.result(5) for future in futures]
+        self.assertEqual([venue['id'] for venue in details['objects']], ids)
+        self.assertEqual(menus, self.blocking.get_menus(ids[0]))
+        self.assertEqual(is_open, self.blocking.is_open(ids[0], '12:00:00', 'Monday'))
+
+    def test_insight_and_execute(self):
+        insight = self.client.insight('category', locality = 'Oakland').result(5)
+        self.assertEqual(insight, self.blocking.insight('category', locality = 'Oakland'))
+        query = self.client.client.prepare('search', locality = 'New York')
+        self.assertEqual(self.client.execute(query).result(5), self.blocking.execute(query))
+
+    def test_errors(self):
+        # invalid arguments raise right away, failed requests through the future
+        self.assertRaises(TypeError, self.client.search, category = 'restaurant')
+        client = AsyncVenueApiClient('', api_url = self.server.api_url)
+        with client:
+            future = client.search(locality = 'Oakland')
+            self.assertRaises(HttpException, future.result, 5)
+            self.assertTrue(isinstance(future.exception(5), HttpException))
+        self.assertRaises(RuntimeError, client.search, locality = 'Oakland')
+
+    def test_concurrency(self):
+        self.assertEqual(self.client.client.pool.size, 4)
+        futures = [self.client.get_details(venue['id']) for venue in self.server.venues[:20]]
+        self.assertEqual([future.result(5)['objects'][0]['id'] for future in futures],
+                         [venue['id'] for venue in self.server.venues[:20]])
+        self.assertTrue(self.client.client.pool.stats()['created'] <= 4)
+
+    def test_shared_executor(self):
+        with Executor(2) as executor:
+            with AsyncVenueApiClient('key', executor = executor, api_url = self.server.api_url) as client:
+                client.search(locality = 'Oakland').result(5)
+            # the executor is left running for its other users
+            self.assertEqual(executor.submit(len, 'abc').result(5), 3)
+
+
+class AsyncMenuItemApiClientTest(unittest.TestCase):
+
+    def test_search(self):
+        with MockLocuServer(venues = make_venues(60)) as server:
+            blocking = MenuItemApiClient('key', api_url = server.api_url)
+            with AsyncMenuItemApiClient('key', api_url = server.api_url) as client:
+                items = client.search(locality = 'Oakland').result(5)
+                self.assertEqual(items, blocking.search(locality = 'Oakland'))
+                self.assertTrue(items['objects'])
+                ids = [item['id'] for item in items['objects'][:2]]
+                details = client.get_details(ids).result(5)
+                self.assertEqual([item['id'] for item in details['objects']], ids)
+
+
+if __name__ == '__main__':
+    unittest.main()
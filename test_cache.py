@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from httplib2 import Response
+
+from locu import VenueApiClient, ResponseCache, SqliteCache
+from locu.testing import MockLocuServer
+
+
+def _write(args):
+    path, key = args
+    SqliteCache(path).set(key, (Response({'status': '200'}), 'content of %s' % key))
+    return key
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_lru(self):
+        cache = ResponseCache(max_size = 2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        self.assertEqual(cache.stats(), {'hits': 3, 'misses': 1, 'evictions': 1, 'expirations': 0, 'size': 2})
+        self.assertRaises(ValueError, ResponseCache, max_size = 0)
+
+    def test_ttl(self):
+        cache = ResponseCache(ttl = 0.05, ttls = {'details': None, 'insight': 0})
+        cache.set('search', 1, 'search')
+        cache.set('details', 2, 'details')
+        cache.set('insight', 3, 'insight')
+        self.assertIsNone(cache.get('insight'))
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('search'))
+        self.assertEqual(cache.get('details'), 2)
+        self.assertEqual((cache.expirations, len(cache)), (1, 1))
+        cache.delete('details')
+        self.assertEqual(len(cache), 0)
+
+    def test_client(self):
+        with MockLocuServer() as server:
+            cache = ResponseCache()
+            client = VenueApiClient('key', api_url = server.api_url, cache = cache)
+            other_key = VenueApiClient('other', api_url = server.api_url, cache = cache)
+            first = client.search(locality = 'Oakland', category = ['restaurant'])
+            self.assertEqual(other_key.search(category = ['restaurant'], locality = 'Oakland'), first)
+            client.search(locality = 'New York')
+            self.assertEqual(server.requests, 2)
+            self.assertEqual(cache.stats()['hits'], 1)
+            # error responses are not cached
+            self.assertRaises(Exception, VenueApiClient('', api_url = server.api_url, cache = cache).search)
+            self.assertEqual(len(cache), 2)
+
+
+class SqliteCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'cache.db')
+        self.cache = SqliteCache(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def value(self, content):
+        return Response({'status': '200', 'content-type': 'application/json'}), content
+
+    def test_round_trip(self):
+        self.cache.set('key', self.value('{"objects": []}'))
+        header, content = self.cache.get('key')
+        self.assertEqual((header.status, header['content-type'], content), (200, 'application/json', '{"objects": []}'))
+        self.assertIsNone(self.cache.get('missing'))
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 2, 'evictions': 0, 'expirations': 0, 'size': 0})
+
+    def test_ttl(self):
+        cache = SqliteCache(self.path, ttl = 0.05, ttls = {'details': 60, 'insight': 0})
+        cache.set('search', self.value('a'), 'search')
+        cache.set('details', self.value('b'), 'details')
+        cache.set('insight', self.value('c'), 'insight')
+        self.assertIsNone(cache.get('insight'))
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('search'))
+        self.assertEqual(cache.get('details')[1], 'b')
+        self.assertEqual(cache.expirations, 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_evict(self):
+        cache = SqliteCache(self.path, max_bytes = 2500, compress_level = 0)
+        for i in range(5):
+            cache.set('key%d' % i, self.value(os.urandom(1000)))
+            time.sleep(0.01)
+        cache.evict()
+        self.assertEqual(cache.evictions, 3)
+        self.assertEqual([key for key in ('key%d' % i for i in range(5)) if cache.get(key)], ['key3', 'key4'])
+
+    def test_fork(self):
+        self.cache.set('parent', self.value('from parent'))
+        pid = os.fork()
+        if pid == 0:
+            # the parent's connection must not be reused here
+            status = 1
+            try:
+                if self.cache.get('parent')[1] == 'from parent':
+                    self.cache.set('child', self.value('from child'))
+                    status = 0
+            finally:
+                os._exit(status)
+        self.assertEqual(os.waitpid(pid, 0)[1], 0)
+        self.assertEqual(self.cache.get('child')[1], 'from child')
+
+    def test_processes(self):
+        pool = multiprocessing.Pool(4)
+        try:
+            keys = pool.map(_write, [(self.path, 'key%d' % i) for i in range(20)])
+        finally:
+            pool.close()
+            pool.join()
+        self.assertEqual([self.cache.get(key)[1] for key in keys], ['content of %s' % key for key in keys])
+
+    def test_clients(self):
+        with MockLocuServer() as server:
+            first = VenueApiClient('key', api_url = server.api_url, cache = SqliteCache(self.path))
+            second = VenueApiClient('key', api_url = server.api_url, cache = SqliteCache(self.path))
+            self.assertEqual(first.search(locality = 'Oakland'), second.search(locality = 'Oakland'))
+            self.assertEqual(server.requests, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+import threading
+import time
+import unittest
+
+from locu import VenueApiClient, MenuItemApiClient, ResponseCache, SpatialIndex
+from locu.api import HttpException
+from locu.testing import MockLocuServer
+
+
+class ClientTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockLocuServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.venue_client = VenueApiClient('key', api_url = self.server.api_url)
+        self.menu_item_client = MenuItemApiClient('key', api_url = self.server.api_url)
+
+    def test_search_pages(self):
+        venues = self.venue_client.search(locality = 'San Francisco')
+        self.assertEqual(len(venues['objects']), 25)
+        more = self.venue_client.search_next(venues)
+        self.assertTrue(more['objects'])
+        self.assertFalse(set(v['id'] for v in venues['objects']) & set(v['id'] for v in more['objects']))
+        expected = [v for v in self.server.venues if v['locality'] == 'San Francisco']
+        self.assertEqual(len(list(self.venue_client.iter_search(locality = 'San Francisco'))), len(expected))
+
+    def test_details_bulk(self):
+        ids = [v['id'] for v in self.server.venues[:12]]
+        resp = self.venue_client.get_details_bulk(ids + ['missing'])
+        self.assertEqual([v['id'] for v in resp['objects']], ids)
+        self.assertEqual(resp['errors'], [])
+
+    def test_details_bulk_errors(self):
+        ids = [v['id'] for v in reversed(self.server.venues[:30])]
+        with MockLocuServer(self.server.venues, error_rate = 0.4, seed = 3) as failing:
+            client = VenueApiClient('key', api_url = failing.api_url)
+            resp = client.get_details_bulk(ids, max_workers = 1)
+        self.assertTrue(resp['errors'] and resp['objects'])
+        failed = []
+        for error in resp['errors']:
+            self.assertEqual(error['error'].code, 500)
+            self.assertEqual(error['ids'], ids[ids.index(error['ids'][0]):][:5])
+            failed += error['ids']
+        # the other objects keep the order of the given ids
+        self.assertEqual([v['id'] for v in resp['objects']], [id for id in ids if id not in failed])
+
+    def test_is_open_and_menus(self):
+        venue = [v for v in self.server.venues if v['has_menu']][0]
+        day = [d for d, hours in venue['open_hours'].items() if hours][0]
+        opens = venue['open_hours'][day][0].split(' - ')[0]
+        self.assertFalse(self.venue_client.is_open(venue['id'], opens, day))
+        self.assertEqual(self.venue_client.get_menus(venue['id']), venue['menus'])
+
+    def test_menu_items(self):
+        items = self.menu_item_client.search(price__lte = 10)
+        self.assertTrue(items['objects'])
+        self.assertTrue(all(float(item['price']) <= 10 for item in items['objects']))
+        insight = self.menu_item_client.insight('locality')
+        self.assertEqual(sum(insight['objects'].values()), len(self.server._items))
+
+    def test_hours_index(self):
+        ids = [v['id'] for v in self.server.venues[:7]]
+        hours = self.venue_client.hours_index(ids)
+        for id in ids:
+            self.assertEqual(hours.is_open(id, '12:30:00', 'Monday'),
+                             self.venue_client.is_open(id, '12:30:00', 'Monday'))
+        with MockLocuServer(error_rate = 1.0) as failing:
+            client = VenueApiClient('key', api_url = failing.api_url)
+            self.assertRaises(HttpException, client.hours_index, ids)
+
+    def test_insight_many(self):
+        specs = [{'dimension': 'cuisine', 'locality': 'Oakland'}, {'dimension': 'region'}]
+        resp = self.venue_client.insight_many(specs)
+        self.assertEqual([r['spec'] for r in resp['objects']], specs)
+        self.assertEqual(resp['objects'][0]['objects'], self.venue_client.insight(**specs[0])['objects'])
+        self.assertEqual(sum(resp['objects'][1]['objects'].values()), len(self.server.venues))
+        self.assertEqual(resp['errors'], [])
+
+    def test_insight_many_local(self):
+        index = SpatialIndex(self.server.venues)
+        specs = [{'dimension': 'locality'}, {'dimension': 'locality', 'open_at': '2014-01-01T12:00:00'}]
+        requests = self.server.requests
+        resp = self.venue_client.insight_many(specs, local = index)
+        self.assertEqual(resp['objects'][0]['objects'], self.venue_client.insight('locality')['objects'])
+        self.assertEqual(self.server.requests, requests + 2)
+        # menu item counts are not venue counts
+        self.assertRaises(TypeError, self.menu_item_client.insight_many, specs, local = index)
+
+    def test_prepared_subclass(self):
+        class CountingClient(VenueApiClient):
+            def search(self, **kwargs):
+                self.searches.append(kwargs)
+                return super(CountingClient, self).search(**kwargs)
+        client = CountingClient('key', api_url = self.server.api_url)
+        client.searches = []
+        query = client.prepare('search', locality = 'Oakland')
+        self.assertEqual(client.execute(query), client.search(locality = 'Oakland'))
+        self.assertEqual(len(client.searches), 1)
+        menu_query = self.menu_item_client.prepare('insight', dimension = 'price', category = ['bar'])
+        self.assertEqual(self.menu_item_client.execute(menu_query),
+                         self.menu_item_client.insight('price', category = ['bar']))
+
+    def test_prepared(self):
+        client = VenueApiClient('key', api_url = self.server.api_url, cache = ResponseCache())
+        query = client.prepare('search', locality = 'Oakland', category = ['restaurant'])
+        self.assertEqual(client.execute(query), client.search(locality = 'Oakland', category = ['restaurant']))
+        self.assertEqual(client.cache.stats()['hits'], 1)
+        variant = query.replace(locality = 'New York')
+        self.assertEqual(query.kwargs['locality'], 'Oakland')
+        self.assertNotEqual(variant.key, query.key)
+        self.assertEqual(query.replace(locality = 'Oakland'), query)
+        self.assertRaises(AttributeError, setattr, query, 'uri', '')
+        self.assertRaises(TypeError, client.prepare, 'search', dimension = 'region')
+        self.assertRaises(TypeError, client.prepare, 'search', category = 'restaurant')
+        details = client.execute(client.prepare('details', ids = [self.server.venues[0]['id']]))
+        self.assertEqual(details['objects'][0]['id'], self.server.venues[0]['id'])
+        self.assertRaises(ValueError, client.prepare, 'details', ids = ['a', 'b', 'c', 'd', 'e', 'f'])
+
+    def test_prepared_arguments(self):
+        query = self.venue_client.prepare('search', locality = 'Oakland', category = ['restaurant'])
+        query.kwargs['locality'] = 'New York'
+        query.kwargs['category'].append('spa')
+        self.assertEqual(query.kwargs, {'locality': 'Oakland', 'category': ['restaurant']})
+        self.assertEqual(query.replace(), query)
+        # arguments menu item search ignores are ignored by prepare as well
+        query = self.menu_item_client.prepare('search', name = 'Pizza', category = ['restaurant'])
+        self.assertEqual(query, self.menu_item_client.prepare('search', name = 'Pizza'))
+        self.assertRaises(TypeError, self.menu_item_client.prepare, 'insight', name = 'Pizza')
+
+    def test_revalidate(self):
+        client = VenueApiClient('key', api_url = self.server.api_url, revalidate = True)
+        id = self.server.venues[0]['id']
+        not_modified = self.server.not_modified
+        first = client.get_details(id)
+        self.assertEqual(client.get_details(id), first)
+        self.assertEqual(self.server.not_modified, not_modified + 1)
+
+    def test_error(self):
+        client = VenueApiClient('', api_url = self.server.api_url)
+        self.assertRaises(HttpException, client.search)
+
+
+class PagedClient(VenueApiClient):
+    """Serves numbered pages of one object each, without a server."""
+
+    def __init__(self, pages, fail_at = None):
+        VenueApiClient.__init__(self, 'key')
+        self.pages = pages
+        self.fail_at = fail_at
+        self.fetched = 0
+
+    def _page(self, number):
+        if number == self.fail_at:
+            raise HttpException(500, 'Internal Server Error')
+        self.fetched += 1
+        next = number + 1 if number + 1 < self.pages else None
+        return {'meta': {'next': next}, 'objects': [number]}
+
+    def search(self, **kwargs):
+        return self._page(0)
+
+    def search_next(self, obj):
+        if obj['meta']['next'] is None:
+            return {}
+        return self._page(obj['meta']['next'])
+
+
+class IterSearchTest(unittest.TestCase):
+
+    def wait_for_fetches(self, client):
+        # let the fetch thread run until it blocks
+        fetched = -1
+        while fetched != client.fetched:
+            fetched = client.fetched
+            time.sleep(0.05)
+
+    def test_all_pages(self):
+        self.assertEqual(list(PagedClient(5).iter_search()), range(5))
+        self.assertEqual(list(PagedClient(5).iter_search(prefetch = 3)), range(5))
+        self.assertRaises(ValueError, list, PagedClient(5).iter_search(prefetch = 0))
+
+    def test_max_pages(self):
+        client = PagedClient(10)
+        self.assertEqual(list(client.iter_search(max_pages = 3)), range(3))
+        self.assertEqual(client.fetched, 3)
+
+    def test_prefetch_bound(self):
+        for prefetch in (1, 2, 4):
+            client = PagedClient(20)
+            objects = client.iter_search(prefetch = prefetch)
+            for taken in range(1, 4):
+                self.assertEqual(next(objects), taken - 1)
+                self.wait_for_fetches(client)
+                # the page being consumed plus at most prefetch ahead of it
+                self.assertEqual(client.fetched, taken + prefetch)
+            objects.close()
+
+    def test_error_mid_stream(self):
+        objects = PagedClient(10, fail_at = 3).iter_search()
+        self.assertEqual([next(objects) for _ in range(3)], [0, 1, 2])
+        self.assertRaises(HttpException, next, objects)
+
+    def test_close_early(self):
+        client = PagedClient(1000)
+        before = set(threading.enumerate())
+        objects = client.iter_search(prefetch = 2)
+        next(objects)
+        fetchers = set(threading.enumerate()) - before
+        self.assertEqual(len(fetchers), 1)
+        objects.close()
+        fetcher = fetchers.pop()
+        fetcher.join(2)
+        self.assertFalse(fetcher.is_alive())
+        self.assertTrue(client.fetched <= 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
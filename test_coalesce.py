@@ -0,0 +1,117 @@
+import threading
+import time
+import unittest
+
+from locu import VenueApiClient, SingleFlight
+from locu.async_api import AsyncVenueApiClient
+from locu.testing import MockLocuServer
+from locu.workers import Executor
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.calls = []
+        self.release = threading.Event()
+
+    def slow(self, value):
+        self.calls.append(value)
+        self.release.wait(5)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def run_threads(self, value, count = 5):
+        results = []
+        def call():
+            try:
+                results.append(self.flight.do('key', self.slow, value))
+            except Exception as error:
+                results.append(error)
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        # wait until every thread joined the running call
+        while self.flight.stats()['coalesced'] < count - 1:
+            time.sleep(0.001)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_do(self):
+        results = self.run_threads('value')
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(self.calls, ['value'])
+        self.assertEqual(self.flight.stats(), {'calls': 1, 'coalesced': 4, 'in_flight': 0})
+
+    def test_do_exception(self):
+        error = ValueError('failed')
+        results = self.run_threads(error)
+        self.assertEqual(results, [error] * 5)
+        self.assertEqual(len(self.calls), 1)
+        # a later call runs again
+        self.assertEqual(self.flight.do('key', lambda: 'again'), 'again')
+
+    def test_submit(self):
+        executor = Executor(1)
+        try:
+            futures = [self.flight.submit('key', executor, self.slow, 'value') for _ in range(3)]
+            self.assertTrue(futures[0] is futures[1] is futures[2])
+            self.release.set()
+            self.assertEqual(futures[0].result(5), 'value')
+            self.assertEqual(self.calls, ['value'])
+            failed = self.flight.submit('other', executor, self.slow, KeyError('x'))
+            self.assertRaises(KeyError, failed.result, 5)
+        finally:
+            executor.shutdown()
+
+    def test_submit_rejected(self):
+        executor = Executor(1)
+        executor.shutdown()
+        self.assertRaises(RuntimeError, self.flight.submit, 'key', executor, self.slow, 'value')
+        self.assertEqual(self.flight.stats()['in_flight'], 0)
+        self.assertEqual(self.flight.do('key', lambda: 'again'), 'again')
+
+    def test_async_client(self):
+        with MockLocuServer(latency = 0.05) as server:
+            with AsyncVenueApiClient('key', api_url = server.api_url, coalesce = True) as client:
+                futures = [client.search(locality = 'Oakland') for _ in range(5)]
+                self.assertEqual(len(set(id(f.result()) for f in futures)), 1)
+                stats = client.client.coalescer.stats()
+                self.assertEqual((stats['calls'], stats['coalesced']), (1, 4))
+                self.assertEqual(server.requests, 1)
+                # blocking and async calls share keys
+                query = client.client.prepare('search', locality = 'Oakland')
+                self.assertEqual(client.execute(query).result(), client.client.execute(query))
+
+    def test_async_details_single_worker(self):
+        # get_menus and get_details wait on one request queued behind a search
+        with MockLocuServer(latency = 0.05) as server:
+            id = server.venues[0]['id']
+            with AsyncVenueApiClient('key', max_concurrency = 1, api_url = server.api_url,
+                                     coalesce = True) as client:
+                search = client.search(locality = 'Oakland')
+                menus = client.get_menus(id)
+                is_open = client.is_open(id, '12:00:00', 'Monday')
+                details = client.get_details(id)
+                self.assertEqual(menus.result(5), client.client._menus(details.result(5)['objects']))
+                self.assertIn(is_open.result(5), (True, False, None))
+                search.result(5)
+                self.assertEqual(client.client.coalescer.stats()['in_flight'], 0)
+                self.assertEqual(server.requests, 2)
+
+    def test_closed_async_client(self):
+        with MockLocuServer() as server:
+            flight = SingleFlight()
+            client = AsyncVenueApiClient('key', api_url = server.api_url, coalesce = flight)
+            client.close()
+            self.assertRaises(RuntimeError, client.search, locality = 'Oakland')
+            self.assertEqual(flight.stats()['in_flight'], 0)
+            blocking = VenueApiClient('key', api_url = server.api_url, coalesce = flight)
+            self.assertTrue(blocking.search(locality = 'Oakland')['objects'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from locu import VenueApiClient, RegionCrawler
+from locu.testing import MockLocuServer, make_venues
+
+
+TL = (37.83, -122.48)
+BR = (37.72, -122.36)
+
+
+def read_log(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def read_state(path):
+    return [record for record in read_log(path) if 'pending' in record][-1]
+
+
+class RegionCrawlerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockLocuServer(make_venues(600)).start()
+        cls.expected = set(v['id'] for v in cls.server.venues if v['locality'] == 'San Francisco')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.checkpoint = os.path.join(self.dir, 'crawl.json')
+        self.client = VenueApiClient('key', api_url = self.server.api_url)
+
+    def tearDown(self):
+        self.server.error_rate = 0
+        shutil.rmtree(self.dir)
+
+    def test_split(self):
+        self.assertTrue(len(self.expected) > 25)
+        crawler = RegionCrawler(self.client, TL, BR, max_workers = 4)
+        venues = crawler.crawl()
+        self.assertEqual(set(venues), self.expected)
+        # the capped first tile was split
+        self.assertTrue(crawler.tiles_done > 1)
+        self.assertEqual(crawler.errors, [])
+
+    def test_truncated(self):
+        crawler = RegionCrawler(self.client, TL, BR, min_tile_size = 0.1)
+        venues = crawler.crawl()
+        self.assertEqual(len(venues), 25)
+        self.assertEqual(crawler.truncated, [TL + BR])
+        self.assertEqual(crawler.errors, [])
+
+    def test_checkpoint_appends(self):
+        crawler = RegionCrawler(self.client, TL, BR, checkpoint = self.checkpoint, checkpoint_every = 1)
+        venues = crawler.crawl()
+        log = read_log(self.checkpoint)
+        self.assertEqual(len([record for record in log if 'pending' in record]), crawler.tiles_done + 1)
+        # each venue is written with the tiles it was found in, not with every save
+        written = sum(len(record.get('venues', {})) for record in log)
+        self.assertTrue(len(venues) <= written < 2 * len(venues))
+        self.assertEqual(RegionCrawler(self.client, TL, BR, checkpoint = self.checkpoint).venues, venues)
+
+    def test_failed_tiles_kept(self):
+        self.server.error_rate = 1
+        crawler = RegionCrawler(self.client, TL, BR, checkpoint = self.checkpoint)
+        self.assertEqual(crawler.crawl(), {})
+        self.assertEqual(len(crawler.errors), 1)
+        self.assertEqual(read_state(self.checkpoint)['pending'], [list(TL + BR)])
+
+        self.server.error_rate = 0
+        crawler = RegionCrawler(self.client, TL, BR, checkpoint = self.checkpoint)
+        self.assertEqual(set(crawler.crawl()), self.expected)
+        self.assertEqual(read_state(self.checkpoint)['pending'], [])
+
+    def test_resume(self):
+        mid_lat = (TL[0] + BR[0]) / 2
+        done = [v for v in self.server.venues if v['id'] in self.expected and v['lat'] >= mid_lat]
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'pending': [[mid_lat, TL[1], BR[0], BR[1]]],
+                       'venues': dict((v['id'], v) for v in done), 'tiles_done': 3}, f)
+        requests = self.server.requests
+        RegionCrawler(self.client, TL, BR).crawl()
+        full = self.server.requests - requests
+
+        requests = self.server.requests
+        crawler = RegionCrawler(self.client, TL, BR, checkpoint = self.checkpoint)
+        self.assertEqual(set(crawler.crawl()), self.expected)
+        self.assertTrue(crawler.tiles_done > 3)
+        # only the pending lower half was searched
+        self.assertTrue(self.server.requests - requests < full)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+from datetime import datetime
+import unittest
+
+from locu.hours import OpenHoursIndex
+
+
+VENUES = [
+    {'id': 'lunch', 'open_hours': {'Monday': ['09:00:00 - 15:00:00'], 'Tuesday': []}},
+    {'id': 'bar', 'open_hours': {'Friday': ['18:00:00 - 02:00:00'], 'Sunday': ['20:00:00 - 01:00:00']}},
+    {'id': 'no_data', 'open_hours': {}},
+]
+
+
+class OpenHoursIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = OpenHoursIndex(VENUES)
+
+    def test_no_data(self):
+        self.assertIsNone(self.index.is_open('no_data', "12:00:00", "Monday"))
+        self.assertIsNone(self.index.is_open('lunch', "12:00:00", "Tuesday"))
+        self.assertIsNone(self.index.is_open('unknown', "12:00:00", "Monday"))
+
+    def test_open(self):
+        self.assertTrue(self.index.is_open('lunch', "12:00:00", "Monday"))
+        self.assertTrue(self.index.is_open('lunch', datetime(2013, 1, 7, 12, 0)))
+
+    def test_closed(self):
+        self.assertFalse(self.index.is_open('lunch', "16:00:00", "Monday"))
+
+    def test_overnight(self):
+        self.assertTrue(self.index.is_open('bar', "01:30:00", "Saturday"))
+        self.assertFalse(self.index.is_open('bar', "17:00:00", "Friday"))
+        self.assertTrue(self.index.is_open('bar', "00:30:00", "Monday"))
+
+    def test_many_venues(self):
+        self.assertEqual(self.index.open_venues("13:00:00", "Monday"), set(['lunch']))
+        self.assertEqual(self.index.open_venues("00:30:00", "Monday"), set(['bar']))
+        self.assertEqual(self.index.open_status(['lunch', 'bar', 'no_data'], "16:00:00", "Monday"),
+                         {'lunch': False, 'bar': None, 'no_data': None})
+
+    def test_many_times(self):
+        times = [("08:00:00", "Monday"), ("09:00:00", "Monday"), ("15:00:00", "Monday")]
+        self.assertEqual(self.index.is_open_at('lunch', times), [False, True, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from locu import VenueApiClient
+from locu.lookup import NameIndex, normalize
+from locu.testing import MockLocuServer
+
+
+VENUES = [
+    {'id': 'a', 'name': u'Café Roma', 'street_address': '526 Columbus Ave', 'locality': 'San Francisco', 'postal_code': '94133'},
+    {'id': 'b', 'name': 'Roma Pizza', 'street_address': '12 Main St', 'locality': 'San Francisco', 'postal_code': '94103'},
+    {'id': 'c', 'name': 'Cafe Roma', 'street_address': '885 Bryant St', 'locality': 'Oakland', 'postal_code': '94612'},
+    {'id': 'no_name', 'name': None},
+]
+
+
+class NameIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = NameIndex(VENUES)
+
+    def ids(self, ranked):
+        return [venue['id'] for score, venue in ranked]
+
+    def test_normalize(self):
+        self.assertEqual(normalize(u'Café & Bar, 12 Main St.'), 'cafe and bar 12 main street')
+
+    def test_lookup(self):
+        ranked = self.index.lookup('cafe roma', locality = 'san francisco')
+        self.assertEqual(self.ids(ranked), ['a', 'b'])
+        self.assertAlmostEqual(ranked[0][0], 1.0)
+        self.assertEqual(self.ids(self.index.lookup('caffe rome'))[:2], ['a', 'c'])
+
+    def test_prefix(self):
+        self.assertEqual(self.ids(self.index.lookup('roma piz'))[0], 'b')
+
+    def test_address(self):
+        ranked = self.index.lookup('cafe roma', street_address = '885 Bryant Street', postal_code = '94612')
+        self.assertEqual(self.ids(ranked)[0], 'c')
+
+    def test_replace_and_remove(self):
+        self.index.add({'id': 'b', 'name': 'Golden Dragon', 'locality': 'San Francisco'})
+        self.assertEqual(self.ids(self.index.lookup('roma pizza')), ['a', 'c'])
+        self.index.remove('a')
+        self.assertEqual(self.ids(self.index.lookup('roma', locality = 'San Francisco')), [])
+        self.assertEqual(len(self.index), 2)
+
+    def test_resolve(self):
+        with MockLocuServer() as server:
+            client = VenueApiClient('key', api_url = server.api_url)
+            venue = server.venues[3]
+            venues = self.index.resolve(client, venue['name'], locality = venue['locality'])
+            self.assertEqual(venues[0]['id'], venue['id'])
+            self.assertIn(venue['id'], self.index)
+            requests = server.requests
+            self.index.resolve(client, venue['name'], locality = venue['locality'])
+            self.assertEqual(server.requests, requests)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+
+from locu import VenueApiClient, Metrics, ResponseCache, RetryPolicy
+from locu.api import HttpException
+from locu.testing import MockLocuServer
+
+
+def make_event(time, endpoint = 'search', total = 0.003, **fields):
+    event = {
+        'endpoint': endpoint, 'key': '/search/', 'time': time,
+        'status': 200, 'bytes': 100, 'cache': None, 'retries': 0, 'new_connection': False,
+        'wait': 0.0, 'transfer': total, 'decode': 0.0, 'convert': 0.0, 'total': total, 'error': None,
+    }
+    event.update(fields)
+    return event
+
+
+class MetricsTest(unittest.TestCase):
+
+    def test_counters(self):
+        metrics = Metrics(window = 60, slots = 6)
+        metrics(make_event(1000, bytes = 50))
+        metrics(make_event(1001, cache = 'hit'))
+        metrics(make_event(1002, status = 500, retries = 2))
+        metrics(make_event(1003, status = None, error = IOError('reset')))
+        metrics(make_event(1004, endpoint = 'details'))
+        snapshot = metrics.snapshot(now = 1005)
+        self.assertEqual(sorted(snapshot), ['details', 'search'])
+        search = snapshot['search']
+        self.assertEqual((search['count'], search['errors'], search['cache_hits'], search['retries'], search['bytes']),
+                         (4, 2, 1, 2, 350))
+        self.assertEqual(snapshot['details']['count'], 1)
+
+    def test_percentiles(self):
+        metrics = Metrics()
+        for i in range(98):
+            metrics(make_event(1000, total = 0.003))
+        metrics(make_event(1000, total = 0.04))
+        metrics(make_event(1000, total = 20))
+        total = metrics.snapshot(now = 1000)['search']['total']
+        self.assertEqual((total['p50'], total['p90'], total['p99']), (5, 5, 50))
+        buckets = dict(total['buckets'])
+        self.assertEqual((buckets[5], buckets[50], buckets[float('inf')]), (98, 1, 1))
+        self.assertEqual(sum(buckets.values()), 100)
+        self.assertEqual(metrics.snapshot(now = 1000)['search']['wait']['p99'], 1)
+
+    def test_window(self):
+        metrics = Metrics(window = 60, slots = 6)
+        metrics(make_event(1000))
+        metrics(make_event(1035))
+        self.assertEqual(metrics.snapshot(now = 1040)['search']['count'], 2)
+        self.assertEqual(metrics.snapshot(now = 1065)['search']['count'], 1)
+        self.assertEqual(metrics.snapshot(now = 1100), {})
+        # a slot is reused once its time has passed
+        metrics(make_event(1060))
+        self.assertEqual(metrics.snapshot(now = 1060)['search']['count'], 2)
+
+
+class ObserverTest(unittest.TestCase):
+
+    def test_events(self):
+        events = []
+        metrics = Metrics()
+        with MockLocuServer() as server:
+            client = VenueApiClient('key', api_url = server.api_url, cache = ResponseCache(), observers = [metrics])
+            client.add_observer(events.append)
+            client.search(locality = 'Oakland')
+            client.search(locality = 'Oakland')
+            client.remove_observer(events.append)
+            client.search(locality = 'New York')
+        self.assertEqual([event['cache'] for event in events], ['miss', 'hit'])
+        miss, hit = events
+        self.assertEqual((miss['endpoint'], miss['status'], miss['error']), ('search', 200, None))
+        self.assertTrue(miss['bytes'] > 0)
+        self.assertNotIn('api_key', miss['key'])
+        self.assertEqual(hit['key'], miss['key'])
+        for event in events:
+            self.assertTrue(event['total'] >= event['wait'] + event['transfer'] + event['decode'] + event['convert'] - 1e-6)
+        self.assertEqual(server.requests, 2)
+        self.assertEqual(metrics.snapshot()['search']['count'], 3)
+        self.assertEqual(metrics.snapshot()['search']['cache_hits'], 1)
+
+    def test_convert_timing(self):
+        events = []
+        with MockLocuServer() as server:
+            client = VenueApiClient('key', api_url = server.api_url, observers = [events.append],
+                                    records = True, entity_store = True)
+            client.search(locality = 'Oakland')
+        event = events[0]
+        self.assertTrue(event['convert'] > 0)
+        self.assertTrue(event['decode'] + event['convert'] <= event['total'])
+        metrics = Metrics()
+        metrics(event)
+        self.assertIsNotNone(metrics.snapshot(now = event['time'])['search']['convert']['p99'])
+
+    def test_error_event(self):
+        events = []
+        with MockLocuServer(error_rate = 1.0) as server:
+            client = VenueApiClient('key', api_url = server.api_url, observers = [events.append],
+                                    retry = RetryPolicy(max_retries = 2, backoff = 0.001))
+            self.assertRaises(HttpException, client.get_details, ['a'])
+        self.assertEqual(len(events), 1)
+        event = events[0]
+        self.assertEqual((event['endpoint'], event['status'], event['retries'], event['cache']),
+                         ('details', 500, 2, None))
+        self.assertTrue(isinstance(event['error'], HttpException))
+
+
+if __name__ == '__main__':
+    unittest.main()
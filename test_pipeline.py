@@ -0,0 +1,54 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from locu.pipeline import hydrate
+from locu.testing import MockLocuServer, make_venues
+
+
+class PipelineTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockLocuServer(make_venues(120)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.output = os.path.join(self.dir, 'venues.ndjson')
+        self.checkpoint = os.path.join(self.dir, 'done.txt')
+        self.ids = [v['id'] for v in self.server.venues]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def hydrate(self, ids, **kwargs):
+        return hydrate('key', ids, self.output, checkpoint = self.checkpoint, processes = 2, threads = 2, \
+                           batch_size = 10, client_kwargs = {'api_url': self.server.api_url}, **kwargs)
+
+    def test_resume(self):
+        stats = self.hydrate(self.ids[:50])
+        self.assertEqual((stats['done'], stats['failed'], stats['skipped']), (50, 0, 0))
+        stats = self.hydrate(iter(self.ids))
+        self.assertEqual((stats['done'], stats['skipped']), (70, 50))
+        with open(self.output) as f:
+            venues = [json.loads(line) for line in f]
+        self.assertEqual(sorted(v['id'] for v in venues), sorted(self.ids))
+        self.assertIn('open_hours', venues[0])
+
+    def test_csv(self):
+        self.output = os.path.join(self.dir, 'venues.csv')
+        self.hydrate(self.ids[:5], format = 'csv', fields = ['id', 'name'])
+        with open(self.output) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], 'id,name')
+        self.assertEqual(len(lines), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
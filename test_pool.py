@@ -0,0 +1,104 @@
+import threading
+import time
+import unittest
+
+from locu import VenueApiClient, ConnectionPool
+from locu.testing import MockLocuServer
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def test_reuse(self):
+        pool = ConnectionPool(size = 2, http_factory = object)
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        second = pool.acquire()
+        self.assertIsNot(second, first)
+        pool.release(first)
+        pool.release(second)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['idle'], stats['in_use']), (2, 2, 0))
+        self.assertEqual((stats['checkouts'], stats['reused']), (3, 1))
+        self.assertRaises(ValueError, ConnectionPool, size = 0)
+
+    def test_bound(self):
+        pool = ConnectionPool(size = 1, timeout = 0.05, http_factory = object)
+        conn = pool.acquire()
+        self.assertRaises(RuntimeError, pool.acquire)
+
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+        pool.timeout = None
+        waiter.start()
+        time.sleep(0.05)
+        self.assertEqual(acquired, [])
+        pool.release(conn)
+        waiter.join(1)
+        self.assertEqual(acquired, [conn])
+        self.assertEqual(pool.stats()['created'], 1)
+        self.assertEqual(pool.waits, 2)
+
+    def test_timeout_after_lost_wakeup(self):
+        # a waiter woken for a connection another thread took keeps
+        # waiting until its own timeout
+        pool = ConnectionPool(size = 1, timeout = 0.5, http_factory = object)
+        conn = pool.acquire()
+        results = []
+        def wait():
+            started = time.time()
+            try:
+                results.append(pool.acquire())
+            except RuntimeError:
+                results.append(time.time() - started)
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        time.sleep(0.05)
+        with pool._cond:
+            # hand the connection over and take it back before the waiter runs
+            pool._idle.append(conn)
+            pool._cond.notify()
+            pool._idle.pop()
+        time.sleep(0.05)
+        pool.release(conn)
+        waiter.join(1)
+        self.assertEqual(results, [conn])
+
+    def test_discard(self):
+        pool = ConnectionPool(size = 1, http_factory = object)
+        try:
+            with pool.connection() as broken:
+                raise IOError('reset')
+        except IOError:
+            pass
+        self.assertEqual(pool.stats()['created'], 0)
+        with pool.connection() as conn:
+            self.assertIsNot(conn, broken)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_factory_error(self):
+        def factory():
+            raise IOError('no sockets')
+        pool = ConnectionPool(size = 1, timeout = 0.05, http_factory = factory)
+        self.assertRaises(IOError, pool.acquire)
+        pool.http_factory = object
+        pool.release(pool.acquire())
+
+    def test_client(self):
+        pool = ConnectionPool(size = 2)
+        with MockLocuServer() as server:
+            client = VenueApiClient('key', api_url = server.api_url, pool = pool)
+            threads = [threading.Thread(target=client.search, kwargs={'locality': 'Oakland'}) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        stats = pool.stats()
+        self.assertEqual(server.requests, 8)
+        self.assertEqual((stats['checkouts'], stats['in_use']), (8, 0))
+        self.assertTrue(stats['created'] <= 2)
+        self.assertEqual(stats['reused'], 8 - stats['created'])
+
+
+if __name__ == '__main__':
+    unittest.main()
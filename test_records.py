@@ -0,0 +1,43 @@
+import unittest
+
+from locu.records import Venue
+
+
+VENUE = {
+    'id': 'b7b1644a6bb10dff58bd', 'name': 'Cafe', 'locality': u'San Francisco',
+    'categories': [u'restaurant'], 'has_menu': True, 'not_a_field': 1,
+    'open_hours': {'Monday': ['09:00:00 - 15:00:00']},
+    'menus': [{'menu_name': 'Lunch', 'sections': [{'section_name': 'Mains', 'subsections': [
+        {'subsection_name': '', 'contents': [{'type': 'ITEM', 'name': 'Pizza', 'price': '9.50'}]}]}]}],
+}
+
+
+class VenueRecordTest(unittest.TestCase):
+
+    def test_dict_access(self):
+        venue = Venue(VENUE)
+        self.assertEqual(venue['name'], 'Cafe')
+        self.assertEqual(venue.get('not_a_field'), 1)
+        self.assertIsNone(venue.get('website_url'))
+        self.assertRaises(KeyError, lambda: venue['website_url'])
+        self.assertEqual(venue['open_hours']['Monday'], ['09:00:00 - 15:00:00'])
+
+    def test_lazy_menus(self):
+        venue = Venue(VENUE)
+        item = venue.menus[0].sections[0]['subsections'][0]['contents'][0]
+        self.assertEqual(item['price'], '9.50')
+        self.assertEqual(venue['menus'][0]['menu_name'], 'Lunch')
+
+    def test_interned(self):
+        self.assertIs(Venue(dict(VENUE, locality=u'San ' + u'Francisco')).locality,
+                      Venue(VENUE).locality)
+
+    def test_to_dict(self):
+        self.assertEqual(Venue(VENUE).to_dict(), VENUE)
+        venue = Venue(VENUE)
+        venue.menus
+        self.assertEqual(venue.to_dict(), VENUE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from locu.spatial import SpatialIndex
+
+
+VENUES = [
+    {'id': 'a', 'lat': 37.7750, 'long': -122.4183, 'categories': ['restaurant'], 'cuisines': ['italian'], 'has_menu': True},
+    {'id': 'b', 'lat': 37.7760, 'long': -122.4190, 'categories': ['spa'], 'cuisines': [], 'has_menu': False},
+    {'id': 'c', 'lat': 37.8044, 'long': -122.2711, 'categories': ['restaurant'], 'cuisines': ['american'], 'has_menu': True},
+    {'id': 'no_location', 'lat': None, 'long': None},
+]
+
+
+class SpatialIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SpatialIndex(VENUES)
+
+    def ids(self, resp):
+        return [v['id'] for v in resp['objects']]
+
+    def test_radius(self):
+        resp = self.index.search(location = (37.7761, -122.4190), radius = 500)
+        self.assertEqual(self.ids(resp), ['b', 'a'])
+
+    def test_bounds(self):
+        resp = self.index.search(tl_coord = (37.81, -122.42), br_coord = (37.80, -122.27))
+        self.assertEqual(self.ids(resp), ['c'])
+
+    def test_filters(self):
+        resp = self.index.search(category = ['restaurant'], has_menu = True, location = (37.775, -122.4183))
+        self.assertEqual(self.ids(resp), ['a', 'c'])
+        resp = self.index.search(cuisine = ['american'])
+        self.assertEqual(self.ids(resp), ['c'])
+
+    def test_replace(self):
+        self.index.add({'id': 'a', 'lat': 37.8044, 'long': -122.2711})
+        resp = self.index.search(location = (37.775, -122.4183), radius = 500)
+        self.assertEqual(self.ids(resp), ['b'])
+        self.assertEqual(len(self.index), 3)
+
+    def test_changed_venue(self):
+        venue = {'id': 'd', 'lat': 37.77, 'long': -122.41}
+        self.index.add(venue)
+        venue['lat'], venue['long'] = 40.71, -74.0
+        self.index.add(venue)
+        self.assertEqual(self.ids(self.index.search(location = (40.71, -74.0), radius = 100)), ['d'])
+        self.index.remove('d')
+        self.assertNotIn('d', self.index)
+
+    def test_insight(self):
+        resp = self.index.insight('cuisine', category = ['restaurant'])
+        self.assertEqual(resp['objects'], {'italian': 1, 'american': 1})
+        resp = self.index.insight('category', location = (37.775, -122.4183), radius = 500, name = 'B')
+        self.assertEqual(resp['objects'], {})
+        self.assertRaises(ValueError, self.index.insight, 'category', open_at = '2014-01-01T12:00:00')
+
+
+if __name__ == '__main__':
+    unittest.main()
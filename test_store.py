@@ -0,0 +1,93 @@
+import time
+import unittest
+
+from locu import VenueApiClient, MenuItemApiClient
+from locu.spatial import SpatialIndex
+from locu.store import EntityStore
+from locu.testing import MockLocuServer
+
+
+class EntityStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = EntityStore(max_size = 2, ttl = 60)
+
+    def test_merge(self):
+        summary = self.store.merge({'id': 'a', 'name': 'Cafe', 'locality': 'Oakland'})
+        details = self.store.merge({'id': 'a', 'name': 'Cafe Roma', 'menus': []})
+        self.assertEqual(summary, {'id': 'a', 'name': 'Cafe', 'locality': 'Oakland'})
+        self.assertEqual(details, {'id': 'a', 'name': 'Cafe Roma', 'locality': 'Oakland', 'menus': []})
+        self.assertIs(self.store.merge({'id': 'a', 'menus': []}), details)
+        self.assertIs(self.store.get('a', ('name', 'menus')), details)
+        self.assertIsNone(self.store.get('a', ('open_hours',)))
+        self.assertEqual(self.store.merge({'name': 'no id'}), {'name': 'no id'})
+
+    def test_freshness(self):
+        self.store.merge({'id': 'a', 'name': 'Cafe'}, now = time.time() - 120)
+        self.store.merge({'id': 'a', 'menus': []})
+        self.assertIsNone(self.store.get('a', ('name', 'menus')))
+        self.assertIsNotNone(self.store.get('a', ('menus',)))
+        self.assertIsNotNone(self.store.get('a', ('name',), max_age = 300))
+
+    def test_eviction(self):
+        for id in 'abc':
+            self.store.merge({'id': id})
+        self.assertEqual(len(self.store), 2)
+        self.assertNotIn(('venue', 'a'), self.store)
+        self.assertIn(('venue', 'c'), self.store)
+
+    def test_kinds(self):
+        venue = self.store.merge({'id': 'a', 'name': 'Cafe'})
+        item = self.store.merge({'id': 'a', 'name': 'Espresso', 'price': 3}, 'menu_item')
+        self.assertEqual(self.store.get('a'), {'id': 'a', 'name': 'Cafe'})
+        self.assertIs(self.store.get('a'), venue)
+        self.assertIs(self.store.get('a', ('price',), kind = 'menu_item'), item)
+        self.store.remove('a', 'menu_item')
+        self.assertIsNone(self.store.get('a', kind = 'menu_item'))
+        self.assertIs(self.store.get('a'), venue)
+
+    def test_shared_by_clients(self):
+        store = EntityStore()
+        with MockLocuServer() as server:
+            venue_client = VenueApiClient('key', api_url = server.api_url, entity_store = store)
+            menu_item_client = MenuItemApiClient('key', api_url = server.api_url, entity_store = store)
+            item = menu_item_client.search(locality = 'Oakland')['objects'][0]
+            self.assertIs(store.get(item['id'], kind = 'menu_item'), item)
+            self.assertIs(store.get(item['venue']['id']), item['venue'])
+            venue = venue_client.get_details(item['venue']['id'])['objects'][0]
+            self.assertEqual(venue['id'], item['venue']['id'])
+            self.assertIsNone(store.get(item['id']))
+
+    def test_client(self):
+        with MockLocuServer() as server:
+            client = VenueApiClient('key', api_url = server.api_url, entity_store = True)
+            venue = [v for v in server.venues if v['has_menu']][0]
+            client.search(name = venue['name'])
+            requests = server.requests
+            menus = client.get_menus(venue['id'])
+            self.assertEqual(menus, venue['menus'])
+            client.is_open(venue['id'], '12:00:00', 'Monday')
+            self.assertEqual(server.requests, requests + 1)
+            stored = client.entity_store.get(venue['id'])
+            self.assertIs(client.get_details(venue['id'])['objects'][0], stored)
+
+    def test_records(self):
+        with MockLocuServer() as server:
+            client = VenueApiClient('key', api_url = server.api_url, entity_store = True, records = True)
+            venue = [v for v in server.venues if v['has_menu']][0]
+            fetched = client.get_menus(venue['id'])
+            stored = client.get_menus(venue['id'])
+            self.assertEqual(type(stored[0]), type(fetched[0]))
+            self.assertEqual(stored[0].to_dict(), fetched[0].to_dict())
+
+    def test_spatial_index(self):
+        index = SpatialIndex()
+        index.add(self.store.merge({'id': 'a', 'lat': 37.77, 'long': -122.41}))
+        index.add(self.store.merge({'id': 'a', 'lat': 40.71, 'long': -74.0}))
+        resp = index.search(location = (40.71, -74.0), radius = 100)
+        self.assertEqual([v['id'] for v in resp['objects']], ['a'])
+        self.assertEqual(len(index), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+from StringIO import StringIO
+
+from locu import VenueApiClient, MenuItemApiClient, RetryPolicy
+from locu.stream import ObjectStream
+from locu.testing import MockLocuServer
+
+
+DOCUMENTS = [
+    '{"meta": {"next": null, "limit": 25}, "objects": [{"id": "a", "price": 12.5}, {"id": "b"}]}',
+    '{"objects": [12.5, 3, 1e5, -0.25, 7E-3, true, false, null, "x\\\\\\"]}", [1, [2]], {}]}',
+    '{"objects": [], "meta": {"next": "/v1_0/venue/search/?offset=25"}}',
+    '{"meta": {"name": "caf\\u00e9"}, "objects": [{"name": "}{][,:"}], "extra": 12345678901234}',
+    ' { "objects" : [ 1 , 2 ] } ',
+    '{}',
+]
+
+
+class ObjectStreamTest(unittest.TestCase):
+
+    def check(self, document, chunk_size):
+        expected = json.loads(document)
+        stream = ObjectStream(StringIO(document).read, None, chunk_size)
+        self.assertEqual(list(stream), expected.pop('objects', []))
+        self.assertEqual(stream.fields, expected)
+
+    def test_chunk_sizes(self):
+        for document in DOCUMENTS:
+            for chunk_size in range(1, 12) + [65536]:
+                self.check(document, chunk_size)
+
+    def test_number_at_chunk_boundary(self):
+        stream = ObjectStream(StringIO('{"objects": [12.5, 3]}').read, None, 4)
+        self.assertEqual(list(stream), [12.5, 3])
+        stream = ObjectStream(StringIO('{"objects": [1e5]}').read, None, 14)
+        self.assertEqual(list(stream), [1e5])
+
+    def test_large_object(self):
+        document = json.dumps({'objects': [{'id': 'a', 'menus': [{'name': 'x' * 100, 'price': i} for i in range(20000)]}]})
+        stream = ObjectStream(StringIO(document).read, None, 4096)
+        decoder, calls = stream._decoder, []
+        class CountingDecoder(object):
+            def raw_decode(self, s, idx):
+                calls.append(idx)
+                return decoder.raw_decode(s, idx)
+        stream._decoder = CountingDecoder()
+        self.assertEqual(list(stream), json.loads(document)['objects'])
+        # not once per chunk of the 2.5MB object
+        self.assertTrue(len(calls) < 30, len(calls))
+
+    def test_close_and_iterate_once(self):
+        closed = []
+        stream = ObjectStream(StringIO(DOCUMENTS[0]).read, lambda: closed.append(True))
+        list(stream)
+        self.assertEqual(closed, [True])
+        self.assertRaises(RuntimeError, list, stream)
+
+    def test_invalid(self):
+        for document in ('{"objects": [1, 2}', '{"objects": [1 2]}', '{"objects": ['):
+            self.assertRaises(ValueError, list, ObjectStream(StringIO(document).read, None, 3))
+
+
+class StreamClientTest(unittest.TestCase):
+
+    def test_stream_search(self):
+        with MockLocuServer() as server:
+            client = VenueApiClient('key', api_url = server.api_url)
+            stream = client.stream_search(locality = 'Oakland', chunk_size = 256)
+            streamed = list(stream)
+            self.assertEqual(streamed, client.search(locality = 'Oakland')['objects'])
+            self.assertTrue(client.stream_next(stream) is not None)
+
+    def test_stream_search_arguments(self):
+        with MockLocuServer() as server:
+            client = MenuItemApiClient('key', api_url = server.api_url)
+            # the same arguments as search, category is not a menu item filter
+            self.assertEqual(list(client.stream_search(locality = 'Oakland', category = ['bar'])),
+                             client.search(locality = 'Oakland', category = ['bar'])['objects'])
+            self.assertRaises(TypeError, client.stream_search, dimension = 'locality')
+
+    def test_stream_retry(self):
+        with MockLocuServer(error_rate = 0.5, seed = 1) as server:
+            client = VenueApiClient('key', api_url = server.api_url, rate_limit = 1000,
+                                    retry = RetryPolicy(max_retries = 10, backoff = 0.001))
+            for _ in range(5):
+                self.assertTrue(list(client.stream_search(locality = 'Oakland')))
+            self.assertTrue(server.errors)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+
+from locu import VenueApiClient, VenueSync
+from locu.testing import MockLocuServer
+
+
+class VenueSyncTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockLocuServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        client = VenueApiClient('key', api_url = self.server.api_url)
+        self.sync = VenueSync(client, os.path.join(self.dir, 'venues.db'), batch_size = 4)
+        self.venues = [dict(venue) for venue in self.server.venues[:6]]
+        self.ids = [venue['id'] for venue in self.venues]
+        self.sync.track(self.ids)
+
+    def tearDown(self):
+        self.server.error_rate = 0
+        for venue in self.venues:
+            self.server._by_id[venue['id']] = venue
+        self.sync.db.close()
+        shutil.rmtree(self.dir)
+
+    def run_all(self):
+        with self.sync.db:
+            self.sync.db.execute('UPDATE venues SET next_due = 0')
+        return sorted((event['type'], event['id']) for event in self.sync.run())
+
+    def test_added(self):
+        events = list(self.sync.run())
+        self.assertEqual(sorted(event['id'] for event in events), sorted(self.ids))
+        self.assertEqual(set(event['type'] for event in events), set(['added']))
+        self.assertEqual(self.sync.get(self.ids[0]), self.venues[0])
+        self.assertEqual(len(self.sync), 6)
+        self.assertEqual(self.sync.due(), [])
+
+    def test_changed_and_removed(self):
+        list(self.sync.run())
+        changed = dict(self.venues[0], name = 'Renamed')
+        self.server._by_id[changed['id']] = changed
+        del self.server._by_id[self.ids[1]]
+        self.assertEqual(self.run_all(), sorted([('changed', self.ids[0]), ('removed', self.ids[1])]))
+        self.assertEqual(self.sync.get(self.ids[0])['name'], 'Renamed')
+        self.assertIsNone(self.sync.get(self.ids[1]))
+        self.assertEqual(len(self.sync), 5)
+        # still gone: no second event; back again: added
+        self.assertEqual(self.run_all(), [])
+        self.server._by_id[self.ids[1]] = self.venues[1]
+        self.assertEqual(self.run_all(), [('added', self.ids[1])])
+
+    def test_unchanged_not_rewritten(self):
+        list(self.sync.run())
+        sentinel = zlib.compress('{"sentinel": true}')
+        with self.sync.db:
+            self.sync.db.execute('UPDATE venues SET payload = ? WHERE id = ?', (buffer(sentinel), self.ids[0]))
+        self.assertEqual(self.run_all(), [])
+        self.assertEqual(self.sync.get(self.ids[0]), {'sentinel': True})
+        checks = self.sync.db.execute('SELECT checks, changes FROM venues WHERE id = ?', (self.ids[0],)).fetchone()
+        self.assertEqual(checks, (2, 0))
+
+    def test_failed_stay_due(self):
+        self.server.error_rate = 1
+        self.assertEqual(list(self.sync.run()), [])
+        self.assertEqual(sorted(self.sync.due()), sorted(self.ids))
+        self.server.error_rate = 0
+        self.assertEqual(len(list(self.sync.run())), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import time
+import unittest
+
+from locu import VenueApiClient, RateLimiter, RetryPolicy
+from locu.api import HttpException
+from locu.testing import MockLocuServer
+from locu.throttle import shared_rate_limiter
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def test_delay(self):
+        policy = RetryPolicy(backoff = 0.5, max_backoff = 3)
+        for attempt in range(6):
+            delay = policy.delay(attempt)
+            self.assertTrue(0 <= delay <= min(3, 0.5 * 2 ** attempt))
+        self.assertEqual(policy.delay(0, retry_after = '2'), 2)
+        self.assertEqual(policy.delay(0, retry_after = '60'), 3)
+        self.assertTrue(policy.delay(0, retry_after = 'soon') <= 0.5)
+
+    def test_statuses(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retryable_status('503'))
+        self.assertFalse(policy.is_retryable_status(404))
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_pacing(self):
+        limiter = RateLimiter(50, burst = 1)
+        start = time.time()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertTrue(time.time() - start >= 0.09)
+
+    def test_adaptive(self):
+        limiter = RateLimiter(100, min_rate = 10)
+        for _ in range(10):
+            limiter.failure()
+        self.assertEqual(limiter.rate, 10)
+        for _ in range(20):
+            limiter.success()
+        self.assertAlmostEqual(limiter.rate, 100)
+        fixed = RateLimiter(100, adaptive = False)
+        fixed.failure()
+        self.assertEqual(fixed.rate, 100)
+
+    def test_shared(self):
+        limiter = shared_rate_limiter('test_shared', 5)
+        self.assertTrue(shared_rate_limiter('test_shared', 5) is limiter)
+        self.assertRaises(ValueError, shared_rate_limiter, 'test_shared', 10)
+
+
+class RetryClientTest(unittest.TestCase):
+
+    def test_max_retries(self):
+        with MockLocuServer(error_rate = 1) as server:
+            client = VenueApiClient('key', api_url = server.api_url,
+                                    retry = RetryPolicy(max_retries = 2, backoff = 0.001))
+            self.assertRaises(HttpException, client.search, locality = 'Oakland')
+            self.assertEqual(server.requests, 3)
+
+    def test_retries_succeed(self):
+        with MockLocuServer(error_rate = 0.3, seed = 3) as server:
+            client = VenueApiClient('key', api_url = server.api_url,
+                                    retry = RetryPolicy(max_retries = 20, backoff = 0.001))
+            for venue in server.venues[:20]:
+                self.assertEqual(client.get_details(venue['id'])['objects'][0]['id'], venue['id'])
+            self.assertTrue(server.errors)
+            self.assertEqual(server.requests, 20 + server.errors)
+
+    def test_rate_adapts(self):
+        limiter = RateLimiter(1000, min_rate = 50)
+        with MockLocuServer(error_rate = 1) as server:
+            client = VenueApiClient('key', api_url = server.api_url, rate_limit = limiter,
+                                    retry = RetryPolicy(max_retries = 3, backoff = 0.001))
+            self.assertRaises(HttpException, client.search)
+            self.assertEqual(limiter.rate, 1000 / 16.0)
+            server.error_rate = 0
+            for _ in range(25):
+                client.search()
+            self.assertEqual(limiter.rate, 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()